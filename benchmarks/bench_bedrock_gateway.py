@@ -0,0 +1,76 @@
+# benchmarks/bench_bedrock_gateway.py
+"""Load-test the Bedrock gateway offline against the fake runtime.
+
+The fake throttles above --capacity concurrent calls. Compare raw calls
+(no gateway) with calls through the adaptive gateway, with a mix of
+interactive and batch callers.
+
+    python -m benchmarks.bench_bedrock_gateway --callers 32 --requests 200 --capacity 6
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.bedrock_gateway import BedrockGateway, is_throttle
+from services.fake_bedrock import FakeBedrockRuntime
+
+MODEL_ID = "mistral.mistral-7b-instruct-v0:2"
+
+
+def run(label, call, callers, requests, batch_share):
+    latencies = {"interactive": [], "batch": []}
+    failures = [0]
+    lock = threading.Lock()
+
+    def one(i):
+        lane = "batch" if i % 100 < batch_share * 100 else "interactive"
+        t0 = time.perf_counter()
+        try:
+            call(lane)
+        except Exception as e:
+            if not is_throttle(e):
+                raise
+            with lock:
+                failures[0] += 1
+            return
+        with lock:
+            latencies[lane].append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+    ok = sum(len(v) for v in latencies.values())
+    print(f"{label}: {ok}/{requests} ok, {failures[0]} throttled failures, {ok / wall:.1f} req/s")
+    for lane, vals in latencies.items():
+        if vals:
+            print(f"  {lane:<11} p50 {statistics.median(vals) * 1000:7.0f} ms  max {max(vals) * 1000:7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--batch-share", type=float, default=0.5)
+    args = parser.parse_args()
+
+    body = {"prompt": "benchmark prompt " * 50, "max_tokens": 64, "temperature": 0.2}
+
+    fake = FakeBedrockRuntime(latency=args.latency, tokens_per_sec=2000, capacity=args.capacity)
+    run("direct ", lambda lane: fake.invoke_model(modelId=MODEL_ID, body=json.dumps(body))["body"].read(),
+        args.callers, args.requests, args.batch_share)
+
+    fake = FakeBedrockRuntime(latency=args.latency, tokens_per_sec=2000, capacity=args.capacity)
+    gw = BedrockGateway(client=fake, rps=1000, tpm=10 ** 9, max_attempts=6)
+    run("gateway", lambda lane: gw.invoke(MODEL_ID, body, priority=lane),
+        args.callers, args.requests, args.batch_share)
+    print(f"  fake saw {fake.calls} calls, {fake.throttled} throttled; final limit {gw.snapshot()['concurrency_limit']}")
+
+
+if __name__ == "__main__":
+    main()
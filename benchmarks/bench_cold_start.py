@@ -0,0 +1,78 @@
+# benchmarks/bench_cold_start.py
+"""Cold-start cost: importing the app vs building its AWS clients.
+
+Every measurement runs in a fresh interpreter. "import" is ``import main``
+on its own; "first clients" is the extra time to build the S3 and Bedrock
+clients on first use; "eager x4" rebuilds the old layout, where four
+clients (two s3, two bedrock-runtime) were created at import time. Also
+checks that a forked child gets its own clients instead of the parent's.
+
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT = """
+import time; t0 = time.perf_counter()
+import main
+print(time.perf_counter() - t0)
+"""
+
+FIRST_CLIENTS = """
+import main, time
+from services.aws_clients import get_client
+t0 = time.perf_counter()
+get_client("s3"); get_client("bedrock-runtime"); get_client("bedrock-runtime", max_attempts=1, retry_mode="standard")
+print(time.perf_counter() - t0)
+"""
+
+EAGER = """
+import time; t0 = time.perf_counter()
+import boto3
+for service in ("bedrock-runtime", "s3", "bedrock-runtime", "s3"):
+    boto3.client(service, region_name="us-east-1")
+print(time.perf_counter() - t0)
+"""
+
+FORK = """
+import os
+from services.aws_clients import get_client
+parent = id(get_client("s3"))
+pid = os.fork()
+if pid == 0:
+    os._exit(0 if id(get_client("s3")) != parent else 1)
+_, status = os.waitpid(pid, 0)
+print(os.waitstatus_to_exitcode(status) == 0)
+"""
+
+
+def run(code):
+    env = dict(os.environ, AWS_REGION=os.getenv("AWS_REGION", "us-east-1"),
+               # Keep credential lookup off the network so runs are comparable.
+               AWS_EC2_METADATA_DISABLED="true", BEDROCK_FAKE="0")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return out.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, code in (("import main", IMPORT), ("first clients", FIRST_CLIENTS), ("eager x4 (old)", EAGER)):
+        times = [float(run(code)) for _ in range(args.runs)]
+        print(f"{label:<16} median {statistics.median(times) * 1000:8.1f} ms  "
+              f"min {min(times) * 1000:8.1f} ms  max {max(times) * 1000:8.1f} ms")
+    if hasattr(os, "fork"):
+        print(f"fork-safe clients: {run(FORK)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_hybrid_rank.py
+"""Quality/latency trade-off of the BM25 prefilter in rank_papers_by_relevance.
+
+A synthetic candidate pool is drawn from --topics vocabularies; papers whose
+main topic is topic 0 are relevant. Abstracts only partly reuse the query's
+words, so lexical matching alone misses some of them. The fake embedder maps
+every word toward its topic's centroid (it "knows" synonyms) and pays
+--latency per call. For each prefilter N the table shows the embedding calls
+made, recall@k against the relevant set and wall time.
+
+    python -m benchmarks.bench_hybrid_rank --papers 200 --latency 0.05 --top-k 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault("VECTOR_INDEX_DIR", tempfile.mkdtemp(prefix="bench-index-"))
+
+from services import embeddings  # noqa: E402
+from services.embedding_cache import EmbeddingCache  # noqa: E402
+from services.lexical import bm25_scores, tokenize  # noqa: E402
+
+DIM = 256
+
+
+class TopicEmbedder:
+    def __init__(self, vocab_by_topic, latency, seed=0):
+        rng = np.random.default_rng(seed)
+        self.latency = latency
+        self.centroids = rng.standard_normal((len(vocab_by_topic), DIM))
+        self.topic_of = {w: t for t, words in enumerate(vocab_by_topic) for w in words}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        vec = np.zeros(DIM)
+        for w in tokenize(text):
+            t = self.topic_of.get(w)
+            if t is not None:
+                vec += self.centroids[t]
+            vec += 0.5 * np.random.default_rng(abs(hash(w)) % (2 ** 32)).standard_normal(DIM)
+        return vec
+
+
+def corpus(papers, topics, words_per_topic, own_words=12, other_words=4, seed=1):
+    rng = np.random.default_rng(seed)
+    vocab = [[f"t{t}w{i}" for i in range(words_per_topic)] for t in range(topics)]
+    filler = [f"filler{i}" for i in range(200)]
+    out, relevant = [], set()
+    for n in range(papers):
+        topic = int(rng.integers(topics))
+        own = rng.choice(vocab[topic], size=own_words)
+        other = rng.choice(vocab[int(rng.integers(topics))], size=other_words)
+        words = list(own) + list(other) + list(rng.choice(filler, size=30))
+        rng.shuffle(words)
+        out.append({"title": f"Paper {n}", "url": f"http://bench/{n}", "abstract": " ".join(words)})
+        if topic == 0:
+            relevant.add(f"http://bench/{n}")
+    query = " ".join(vocab[0][:5])
+    return vocab, out, relevant, query
+
+
+def recall(ranked, relevant, k):
+    hits = sum(1 for p in ranked[:k] if p["url"] in relevant)
+    return hits / min(k, len(relevant)) if relevant else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=8)
+    parser.add_argument("--words-per-topic", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--top-k", type=int, default=10)
+    # Fewer on-topic words per abstract make lexical matching weaker relative to the embedder.
+    parser.add_argument("--own-words", type=int, default=12)
+    parser.add_argument("--other-words", type=int, default=4)
+    parser.add_argument("--prefilter", default="0,10,20,30,50,100")
+    args = parser.parse_args()
+
+    vocab, papers, relevant, query = corpus(args.papers, args.topics, args.words_per_topic,
+                                         args.own_words, args.other_words)
+    embedder = TopicEmbedder(vocab, args.latency)
+    embeddings._invoke_embedding = embedder
+
+    bm25_only = [papers[i] for i in np.argsort(-bm25_scores(query, [p["abstract"] for p in papers]), kind="stable")]
+    print(f"papers={args.papers} relevant={len(relevant)} latency={args.latency * 1000:.0f}ms "
+          f"workers={embeddings.EMBED_CONCURRENCY} top_k={args.top_k}")
+    print(f"{'ranker':<22} {'embed calls':>11} {'saved':>6} {'recall@k':>9} {'ms':>8}")
+    print(f"{'bm25 only':<22} {0:>11} {'100%':>6} {recall(bm25_only, relevant, args.top_k):>9.2f} {'-':>8}")
+    for n in (int(x) for x in args.prefilter.split(",")):
+        for fusion in ("cosine", "rrf"):
+            # Fresh in-memory cache per run so every configuration pays for its own embeddings.
+            cache = EmbeddingCache(path=":memory:")
+            embeddings.get_cache = lambda: cache
+            embedder.calls = 0
+            t0 = time.perf_counter()
+            ranked = embeddings.rank_papers_by_relevance(query, papers, prefilter_n=n, fusion=fusion)
+            elapsed = time.perf_counter() - t0
+            calls = embedder.calls - 1  # minus the query embedding
+            label = f"{'embed all' if not n else f'N={n}'} {fusion}"
+            print(f"{label:<22} {calls:>11} {1 - calls / args.papers:>6.0%} "
+                  f"{recall(ranked, relevant, args.top_k):>9.2f} {elapsed * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_pdf_upload.py
+"""Peak memory and disk writes per request: temp-file PDF + upload_file vs
+in-memory PDF + upload_fileobj. S3 is replaced by the in-process fake.
+
+    python -m benchmarks.bench_pdf_upload --words 5000 --requests 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Render in this process: tracemalloc must see the render's memory, and /proc/self/io's write count
+# must not include the pipe to a render worker.
+os.environ["PDF_RENDER_WORKERS"] = "0"
+
+import main as app  # noqa: E402
+from services.aws_clients import clients  # noqa: E402
+from services.fake_s3 import FakeS3  # noqa: E402
+
+
+def disk_writes():
+    """Bytes this process has passed to write(2) so far (Linux only)."""
+    try:
+        with open("/proc/self/io") as fh:
+            for line in fh:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def old_path(text, key, tmpdir):
+    path = os.path.join(tmpdir, os.path.basename(key))
+    app.save_text_as_pdf(text, path)
+    app.upload_file_to_s3(path, app.S3_BUCKET, key)
+
+
+def new_path(text, key, tmpdir):
+    app.upload_file_to_s3(app.render_text_pdf(text), app.S3_BUCKET, key)
+
+
+def measure(label, fn, text, requests):
+    tmpdir = tempfile.mkdtemp()
+    peaks, t0, w0 = [], time.perf_counter(), disk_writes()
+    for i in range(requests):
+        tracemalloc.start()
+        fn(text, f"generated/bench_{label}_{i}.pdf", tmpdir)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - t0
+    w1 = disk_writes()
+    leftover = sum(os.path.getsize(os.path.join(tmpdir, f)) for f in os.listdir(tmpdir))
+    written = f"{(w1 - w0) / requests / 1024:8.1f} KiB" if w0 is not None else "     n/a"
+    print(f"{label:<10} peak {max(peaks) / 1024:8.1f} KiB  written/req {written}  "
+          f"left on disk {leftover / 1024:8.1f} KiB  {elapsed / requests * 1000:6.1f} ms/req")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    clients.set("s3", FakeS3())
+    text = " ".join(f"word{i % 97}" for i in range(args.words))
+    measure("tmp file", old_path, text, args.requests)
+    measure("in-memory", new_path, text, args.requests)
+
+
+if __name__ == "__main__":
+    main()
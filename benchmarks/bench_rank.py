@@ -0,0 +1,72 @@
+# benchmarks/bench_rank.py
+"""Compare the old serial ranking loop with batched, concurrent ranking.
+
+Bedrock is replaced by a fake embedder with a fixed per-call latency, so the
+numbers show round-trip overlap rather than model speed.
+
+    python -m benchmarks.bench_rank --papers 50 --latency 0.08
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# rank_papers_by_relevance also appends to the vector index; keep the fake papers out of ./.cache.
+os.environ.setdefault("VECTOR_INDEX_DIR", tempfile.mkdtemp(prefix="bench-index-"))
+
+from services import embeddings  # noqa: E402
+from services.embedding_cache import EmbeddingCache  # noqa: E402
+
+DIM = 1536
+
+
+def fake_embedding(latency):
+    def _invoke(text):
+        time.sleep(latency)
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(DIM)
+    return _invoke
+
+
+def serial_rank(query, papers):
+    # The original implementation: one call per abstract, one dot per paper.
+    q_emb = embeddings._invoke_embedding(query)
+    scores = []
+    for p in papers:
+        a_emb = embeddings._invoke_embedding(p["abstract"][:2000])
+        sim = float(np.dot(q_emb, a_emb) / (np.linalg.norm(q_emb) * np.linalg.norm(a_emb)))
+        scores.append((sim, p))
+    scores.sort(reverse=True, key=lambda x: x[0])
+    return [p for s, p in scores]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    embeddings._invoke_embedding = fake_embedding(args.latency)
+    embeddings.get_cache = lambda: EmbeddingCache(path=":memory:")
+    papers = [{"title": f"P{i}", "abstract": f"abstract number {i} about retrieval"} for i in range(args.papers)]
+    query = "retrieval augmented generation"
+
+    t0 = time.perf_counter()
+    serial_rank(query, papers)
+    serial = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    embeddings.rank_papers_by_relevance(query, papers, top_k=args.top_k)
+    batched = time.perf_counter() - t0
+
+    print(f"papers={args.papers} latency={args.latency * 1000:.0f}ms workers={embeddings.EMBED_CONCURRENCY}")
+    print(f"serial loop : {serial * 1000:8.1f} ms")
+    print(f"batched     : {batched * 1000:8.1f} ms")
+    print(f"speedup     : {serial / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_typeset.py
+"""PDF rendering under concurrency: layout in the request threads vs the
+process pool. While --threads threads render --papers drafts, a heartbeat
+thread sleeps 5 ms in a loop; its oversleep is how long any other thread
+(or the event loop) would have waited for the GIL.
+
+    python -m benchmarks.bench_typeset --papers 40 --threads 4 --words 1500
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import typeset
+from services.sections import SECTION_HEADERS
+
+VOCAB = ("graph neural networks learn representations over relational data under distribution shift "
+         "with robust training objectives and calibrated uncertainty estimates").split()
+
+
+def draft(words, seed):
+    rng = random.Random(seed)
+    per = max(20, words // len(SECTION_HEADERS))
+    parts = [f"Title: Benchmark Paper {seed}"]
+    for name in SECTION_HEADERS:
+        body = " ".join(rng.choice(VOCAB) for _ in range(per))
+        if name == "references":
+            body = "\n".join(f"[{i}] A. Author, {body[:80]}, 2024." for i in range(1, 9))
+        parts.append(f"{name.title()}\n{body}.")
+    return "\n\n".join(parts)
+
+
+def heartbeat(stop, delays, interval=0.005):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        time.sleep(interval)
+        delays.append(time.perf_counter() - t0 - interval)
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run(label, render_pool, texts, threads):
+    render_pool.render([("abstract", "warm up")], "warm up")  # start workers outside the measurement
+    stop, delays = threading.Event(), []
+    beat = threading.Thread(target=heartbeat, args=(stop, delays), daemon=True)
+    beat.start()
+    t0 = time.perf_counter()
+
+    def one(text):
+        title, sections = typeset.paper_sections(text)
+        return len(render_pool.render(sections, title))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        sizes = list(pool.map(one, texts))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    beat.join()
+    print(f"{label:<18} {len(texts) / elapsed:7.1f} papers/s  {sum(sizes) / len(sizes) / 1024:6.1f} KiB/paper  "
+          f"heartbeat delay p50 {pct(delays, 0.5) * 1000:6.2f} ms  p99 {pct(delays, 0.99) * 1000:6.2f} ms")
+    render_pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=40)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    texts = [draft(args.words, i) for i in range(args.papers)]
+    run("in-thread", typeset.RenderPool(workers=0), texts, args.threads)
+    run(f"process pool x{args.workers}", typeset.RenderPool(workers=args.workers), texts, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/fake_http.py
+"""Local stand-in for the arXiv and Semantic Scholar APIs.
+
+Serves the recorded payloads in ``fixtures/`` with a configurable delay:
+``/api/query`` returns an Atom feed with ``max_results`` entries and
+``/graph/v1/paper/search`` the Semantic Scholar search response.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.bench_arxiv_parse import inflate
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class FakeUpstream:
+    def __init__(self, latency=0.05, host="127.0.0.1", port=0):
+        self.latency = latency
+        with open(os.path.join(FIXTURES, "s2_search.json"), "rb") as fh:
+            self._s2 = json.load(fh)
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with upstream._lock:
+                    upstream.requests += 1
+                time.sleep(upstream.latency)
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                if url.path == "/api/query":
+                    body = upstream.feed(int(params.get("max_results", ["10"])[0]))
+                    ctype = "application/atom+xml"
+                elif url.path == "/graph/v1/paper/search":
+                    body = upstream.s2(int(params.get("limit", ["10"])[0]))
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed(self, entries):
+        with self._lock:
+            if entries not in self._feeds:
+                self._feeds[entries] = inflate(entries)
+            return self._feeds[entries]
+
+    def s2(self, limit):
+        return json.dumps(dict(self._s2, data=self._s2["data"][:limit])).encode("utf-8")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-upstream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,335 @@
+# benchmarks/loadtest.py
+"""Offline load test of the FastAPI app plus per-function benchmarks.
+
+arXiv and Semantic Scholar are served by a local HTTP server replaying the
+recorded payloads in fixtures/, Bedrock by the fake runtime (latency and
+token rate configurable) and S3 by the in-process fake. All caches live in
+a temporary directory, and every request uses a fresh topic unless
+--repeat is set, so the numbers show cold-path cost.
+
+Each scenario reports p50/p95/p99 latency and throughput. The run is written
+as JSON so runs can be compared:
+
+    python -m benchmarks.loadtest --concurrency 8 --requests 40 --out base.json
+    python -m benchmarks.loadtest --concurrency 8 --requests 40 --compare base.json --max-regression 0.15
+    python -m benchmarks.loadtest --only functions
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.bench_arxiv_parse import inflate
+from benchmarks.fake_http import FakeUpstream
+
+SCENARIOS = ("research_job", "research_stream", "chatbot", "history")
+FUNCTIONS = ("fetch_arxiv", "parse_arxiv_feed", "rank_papers_by_relevance", "render_text_pdf")
+
+
+def summarize(latencies, errors, wall):
+    lat = np.asarray(latencies, dtype=np.float64) * 1000
+    out = {"count": len(latencies), "errors": errors, "wall_s": round(wall, 3),
+           "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0}
+    if len(lat):
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        out.update(p50_ms=round(p50, 1), p95_ms=round(p95, 1), p99_ms=round(p99, 1),
+                   mean_ms=round(float(lat.mean()), 1), max_ms=round(float(lat.max()), 1))
+    return out
+
+
+def drive(fn, requests_total, concurrency):
+    """Call ``fn(i)`` ``requests_total`` times from ``concurrency`` threads."""
+    latencies, extras, errors = [], [], []
+    lock = threading.Lock()
+
+    def one(i):
+        t0 = time.perf_counter()
+        try:
+            extra = fn(i)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+            if extra:
+                extras.append(extra)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    result = summarize(latencies, len(errors), time.perf_counter() - t0)
+    if errors:
+        result["first_error"] = errors[0]
+    return result, extras
+
+
+def mean_by_key(dicts):
+    keys = {k for d in dicts for k in d}
+    return {k: round(float(np.mean([d[k] for d in dicts if k in d])), 1) for k in sorted(keys)}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Harness:
+    """Wires the app to the local fakes and serves it with uvicorn on a free port."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        # Point every on-disk cache at the scratch directory before the app is imported.
+        os.environ.update({
+            "BEDROCK_FAKE": "1",
+            "EMBED_CACHE_PATH": os.path.join(self.workdir, "embeddings.sqlite3"),
+            "VECTOR_INDEX_DIR": os.path.join(self.workdir, "vector_index"),
+            "MANIFEST_PATH": os.path.join(self.workdir, "manifest.sqlite3"),
+            "CHAT_STORE_PATH": os.path.join(self.workdir, "chat_store.sqlite3"),
+            "PAPER_STORE_PATH": os.path.join(self.workdir, "papers.sqlite3"),
+        })
+        from services import fetch_papers
+        from services.aws_clients import clients
+        from services.bedrock_gateway import gateway
+        from services.fake_bedrock import FakeBedrockRuntime
+        from services.fake_s3 import FakeS3
+        import main
+
+        self.upstream = FakeUpstream(latency=args.upstream_latency).start()
+        fetch_papers.ARXIV_API = self.upstream.base_url + "/api/query"
+        fetch_papers.S2_BASE = self.upstream.base_url + "/graph/v1"
+        self.bedrock = FakeBedrockRuntime(latency=args.bedrock_latency, tokens_per_sec=args.tokens_per_sec,
+                                          capacity=args.bedrock_capacity)
+        gateway._client = self.bedrock
+        # Titan embeddings have their own account quota, separate from the text model's.
+        self.embedder = FakeBedrockRuntime(latency=args.bedrock_latency, capacity=args.embed_capacity)
+        clients.set("bedrock-runtime", self.embedder)
+        clients.set("s3", FakeS3())
+        self.app = main
+        self.server = None
+        self.base_url = None
+        self.paper_ids = []
+        self._local = threading.local()
+
+    def start_server(self):
+        import uvicorn
+
+        port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(self.app.app, host="127.0.0.1", port=port,
+                                                    log_level="warning"))
+        threading.Thread(target=self.server.run, name="loadtest-uvicorn", daemon=True).start()
+        deadline = time.time() + 15
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+        self.upstream.stop()
+
+    @property
+    def session(self):
+        # One keep-alive session per load-generating thread.
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def topic(self, i):
+        return "offline load test topic" if self.args.repeat else f"offline load test topic {os.getpid()} {i}"
+
+    # ---- end-to-end scenarios ------------------------------------------------
+
+    def research_job(self, i):
+        r = self.session.post(f"{self.base_url}/research/", json={"prompt": self.topic(i)}, timeout=30)
+        r.raise_for_status()
+        status_url = self.base_url + r.json()["status_url"]
+        deadline = time.time() + self.args.timeout
+        while time.time() < deadline:
+            job = self.session.get(status_url, timeout=30).json()
+            if job["status"] == "done":
+                self.paper_ids.append(job["result"]["paper_id"])
+                return job["result"].get("timing")
+            if job["status"] == "failed":
+                raise RuntimeError(job.get("error"))
+            time.sleep(self.args.poll_interval)
+        raise TimeoutError("research job did not finish")
+
+    def research_stream(self, i):
+        t0 = time.perf_counter()
+        ttft = None
+        with self.session.post(f"{self.base_url}/research/stream", json={"prompt": self.topic(f"s{i}")},
+                               stream=True, timeout=self.args.timeout) as r:
+            r.raise_for_status()
+            event = None
+            for line in r.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[7:]
+                    if event == "token" and ttft is None:
+                        ttft = time.perf_counter() - t0
+                elif line.startswith("data: ") and event in ("done", "error"):
+                    data = json.loads(line[6:])
+                    if event == "error":
+                        raise RuntimeError(data.get("detail"))
+                    self.paper_ids.append(data["paper_id"])
+                    return dict(data.get("timing") or {}, ttft=round((ttft or 0) * 1000, 1))
+        raise RuntimeError("stream ended without a done event")
+
+    def chatbot(self, i):
+        if not self.paper_ids:
+            raise RuntimeError("no generated papers to ask about")
+        r = self.session.post(f"{self.base_url}/chatbot/", timeout=self.args.timeout, json={
+            "question": "What method does the paper propose?",
+            "paper_id": self.paper_ids[i % len(self.paper_ids)],
+            "session_id": f"loadtest-{i % 4}",
+        })
+        r.raise_for_status()
+
+    def history(self, i):
+        r = self.session.get(f"{self.base_url}/history/", params={"limit": 20}, timeout=30)
+        r.raise_for_status()
+
+    # ---- per-function benchmarks --------------------------------------------
+
+    def fetch_arxiv(self, i):
+        from services.fetch_papers import fetch_arxiv
+        if len(fetch_arxiv(self.topic(i), max_results=self.args.arxiv_results)) != self.args.arxiv_results:
+            raise RuntimeError("short arXiv page")
+
+    def parse_arxiv_feed(self, i):
+        from services.fetch_papers import parse_arxiv_feed
+        if not hasattr(self, "_feed"):
+            self._feed = inflate(self.args.feed_entries)
+        for _ in parse_arxiv_feed(io.BytesIO(self._feed)):
+            pass
+
+    def rank_papers_by_relevance(self, i):
+        from services.embeddings import rank_papers_by_relevance
+        # Distinct abstracts per call so every call pays for its embeddings.
+        papers = [{"title": f"Paper {i}-{j}", "url": f"http://bench/{i}/{j}",
+                   "abstract": f"Study {i}-{j} of dense retrieval and reranking for question answering."}
+                  for j in range(self.args.rank_papers)]
+        rank_papers_by_relevance(self.topic(i), papers, top_k=10)
+
+    def render_text_pdf(self, i):
+        from services.fake_bedrock import _draft
+        self.app.render_text_pdf(_draft(self.topic(i), self.args.pdf_words))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(current, baseline, max_regression):
+    """Print p95/throughput deltas against a baseline run; return the names that regressed."""
+    regressed = []
+    print(f"\n{'benchmark':<28} {'p95 base':>10} {'p95 now':>10} {'delta':>8} {'rps base':>9} {'rps now':>9}")
+    for name, now in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "p95_ms" not in base or "p95_ms" not in now:
+            continue
+        delta = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        flag = ""
+        if delta > max_regression:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<28} {base['p95_ms']:>10.1f} {now['p95_ms']:>10.1f} {delta:>+7.0%} "
+              f"{base['throughput_rps']:>9.2f} {now['throughput_rps']:>9.2f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario")
+    parser.add_argument("--only", choices=("all", "e2e", "functions"), default="all")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS + FUNCTIONS),
+                        help="comma-separated subset of: " + ", ".join(SCENARIOS + FUNCTIONS))
+    parser.add_argument("--repeat", action="store_true", help="reuse one topic so caches are warm")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="fake arXiv/S2 delay (s)")
+    parser.add_argument("--bedrock-latency", type=float, default=0.3, help="fake Bedrock first-token delay (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=400.0)
+    parser.add_argument("--bedrock-capacity", type=int, default=8, help="fake Bedrock concurrent-call quota")
+    parser.add_argument("--embed-capacity", type=int, default=64, help="fake Titan embedding concurrent-call quota")
+    parser.add_argument("--arxiv-results", type=int, default=25)
+    parser.add_argument("--feed-entries", type=int, default=500)
+    parser.add_argument("--rank-papers", type=int, default=30)
+    parser.add_argument("--pdf-words", type=int, default=600)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--out", default=None, help="JSON output path")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="fail if any p95 grows by more than this fraction over the baseline")
+    args = parser.parse_args()
+
+    wanted = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(wanted) - set(SCENARIOS + FUNCTIONS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.only == "e2e":
+        wanted = [s for s in wanted if s in SCENARIOS]
+    elif args.only == "functions":
+        wanted = [s for s in wanted if s in FUNCTIONS]
+
+    harness = Harness(args)
+    results, stages = {}, {}
+    try:
+        if any(s in SCENARIOS for s in wanted):
+            harness.start_server()
+        for name in wanted:
+            result, extras = drive(getattr(harness, name), args.requests, args.concurrency)
+            results[name] = result
+            if extras:
+                stages[name] = mean_by_key(extras)
+            print(f"{name:<28} {result['count']:>4} ok {result['errors']:>3} err  "
+                  f"p50 {result.get('p50_ms', 0):8.1f}  p95 {result.get('p95_ms', 0):8.1f}  "
+                  f"p99 {result.get('p99_ms', 0):8.1f} ms  {result['throughput_rps']:7.2f}/s")
+    finally:
+        harness.stop()
+
+    run = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": git_revision(),
+                 "python": platform.python_version(), "platform": platform.platform()},
+        "config": vars(args),
+        "results": results,
+        "stage_ms_mean": stages,
+        "app": {"bedrock": harness.app.gateway.snapshot(),
+                "fake_bedrock": {"calls": harness.bedrock.calls, "throttled": harness.bedrock.throttled},
+                "fake_embeddings": {"calls": harness.embedder.calls, "throttled": harness.embedder.throttled},
+                "upstream_requests": harness.upstream.requests,
+                "http": harness.app.http_client.stats()},
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(run, fh, indent=2, default=str)
+        print(f"\nwrote {args.out}")
+    if args.compare:
+        with open(args.compare) as fh:
+            regressed = compare(run, json.load(fh), args.max_regression)
+        if regressed:
+            print(f"\np95 regressions over {args.max_regression:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
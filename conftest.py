@@ -0,0 +1,2 @@
+# conftest.py
+# Lets a bare `pytest` import the top-level `services` package (pytest puts this directory on sys.path).
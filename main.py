@@ -1,39 +1,120 @@
+import asyncio
+import io
+import logging
 import os
 import json
+import queue
+import threading
+import time
 import uuid
-import boto3
-import requests
-from fpdf import FPDF
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+
+# services.* modules read their settings with os.getenv at import time, so .env must be loaded first.
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
 from datetime import datetime
 from botocore.exceptions import ClientError
+from services.aws_clients import clients as aws_clients, get_client, transfer_config
+from services.jobs import JobQueue, QueueFull
+from services.retrieval import retrieve_papers
+from services.paper_store import get_store as get_paper_store
+from services import http_client
+from services.result_cache import ResultCache, normalize_topic, result_key
+from services.bedrock_gateway import gateway
+from services.manifest import Manifest
+from services.sections import section_of
+from services.typeset import paper_sections, pool as render_pool, render as render_pdf
+from services.chat_store import ChatStore, build_chat_prompt
+from services.pipeline import Pipeline, Stage
+from services.prompt_builder import builder as prompt_builder, estimate_tokens
+from services.tracing import BYTES, TOKENS, Trace, end_trace, record, registry, span, start_trace
 
 # =========================================
 # 🔧 CONFIGURATION
 # =========================================
-load_dotenv()
+log = logging.getLogger(__name__)
 
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 S3_BUCKET = os.getenv("S3_BUCKET", "my-research-papers")
 S3_PRESIGN_EXPIRY = int(os.getenv("S3_PRESIGN_EXPIRY", 86400))
+MODEL_ID = "mistral.mistral-7b-instruct-v0:2"
+MAX_TOKENS = 900
+TEMPERATURE = 0.2
+CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", 400))
+BATCH_MAX_TOPICS = int(os.getenv("BATCH_MAX_TOPICS", 100))
+BATCH_WORKERS = {
+    "retrieval": int(os.getenv("BATCH_RETRIEVAL_WORKERS", 4)),
+    "generation": int(os.getenv("BATCH_GENERATION_WORKERS", 4)),
+    "rendering": int(os.getenv("BATCH_RENDERING_WORKERS", 2)),
+    "upload": int(os.getenv("BATCH_UPLOAD_WORKERS", 4)),
+}
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
 
-# AWS Clients
-bedrock = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-s3 = boto3.client("s3", region_name=AWS_REGION)
+manifest = Manifest()
+chat_store = ChatStore()
 
 app = FastAPI(title="AI Research Paper Publisher")
 
+@app.on_event("startup")
+def start_manifest_reconciler():
+    # Runs in each worker after fork, so the reconciler gets that process's own client.
+    manifest.start_reconciler(get_client("s3"), S3_BUCKET)
+
+@app.on_event("shutdown")
+def stop_render_pool():
+    render_pool.shutdown()
+
+# =========================================
+# 📈 TRACING & METRICS
+# =========================================
+REQUEST_SECONDS = registry.histogram("http_request_seconds", "Request latency by route and status.")
+REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled.")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace id and time it; ``X-Timing: 1`` returns the per-stage breakdown."""
+    trace, token = start_trace(request.headers.get("x-trace-id"))
+    REQUESTS_IN_FLIGHT.inc()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        end_trace(token)
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, route=getattr(route, "path", "unmatched"),
+                                method=request.method, status=status)
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if TIMING_HEADER or request.headers.get("x-timing") == "1":
+        response.headers["X-Timing"] = trace.header()
+    return response
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of stage latencies, token/byte counters and queue gauges."""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
 # =========================================
 # 📘 MODELS
 # =========================================
 class PromptRequest(BaseModel):
     prompt: str
 
+class BatchRequest(BaseModel):
+    prompts: List[str]
+
 class ChatRequest(BaseModel):
     question: str
-    context: str
+    paper_id: Optional[str] = None
+    session_id: Optional[str] = None
+    context: Optional[str] = None  # legacy clients that post the whole result
 
 # =========================================
 # 🏠 HOME ROUTE
@@ -42,35 +123,17 @@ class ChatRequest(BaseModel):
 def root():
     return {"message": "✅ AI Research Paper Publisher running."}
 
-# =========================================
-# 📚 FETCH PAPERS FROM ARXIV
-# =========================================
-def fetch_arxiv(topic: str, max_results: int = 3):
-    query = requests.utils.quote(topic)
-    url = f"http://export.arxiv.org/api/query?search_query=all:{query}&start=0&max_results={max_results}"
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-
-    entries = r.text.split("<entry>")[1:]
-    papers = []
-    for entry in entries:
-        try:
-            title = entry.split("<title>")[1].split("</title>")[0].strip()
-            summary = entry.split("<summary>")[1].split("</summary>")[0].strip()
-            link = entry.split("<id>")[1].split("</id>")[0].strip() if "<id>" in entry else ""
-            papers.append({"source": "arXiv", "title": title, "summary": summary, "url": link})
-        except Exception:
-            continue
-    return papers
+@app.get("/stats/")
+def stats():
+    """Operational counters for outbound HTTP and the research job queue."""
+    return {"http": http_client.stats(), "jobs": research_jobs.stats(), "result_cache": result_cache.snapshot(),
+            "bedrock": gateway.snapshot(), "prompts": prompt_builder.snapshot(), "aws": aws_clients.snapshot(),
+            "paper_store": get_paper_store().snapshot(), "pdf_render": render_pool.snapshot()}
 
 # =========================================
 # 🧠 BUILD IEEE PROMPT
 # =========================================
-def build_ieee_prompt(topic: str, papers: list):
-    docs = "\n\n".join([
-        f"Title: {p['title']}\nAbstract: {p['summary']}\nURL: {p.get('url','')}"
-        for p in papers
-    ])
+def _ieee_template(topic: str, docs: str):
     prompt = f"""
 You are an expert academic writer. Using the papers below about "{topic}", generate a well-structured IEEE-style research paper draft.
 Follow these sections strictly and label each section clearly:
@@ -87,18 +150,26 @@ Return only the paper text (with clear section headers).
 """
     return prompt
 
+def build_ieee_prompt_report(topic: str, papers: list):
+    """IEEE prompt with abstracts compressed to the input-token budget, plus a token report."""
+    fitted, report = prompt_builder.fit(topic, papers, fixed_text=_ieee_template(topic, ""))
+    docs = "\n\n".join([
+        f"Title: {p['title']}\nAbstract: {p['abstract']}\nURL: {p.get('url','')}"
+        for p in fitted
+    ])
+    return _ieee_template(topic, docs), report
+
+def build_ieee_prompt(topic: str, papers: list):
+    return build_ieee_prompt_report(topic, papers)[0]
+
 # =========================================
 # 🤖 CALL AWS BEDROCK MODEL
 # =========================================
-def call_bedrock_model(prompt_text: str, model_id: str = "mistral.mistral-7b-instruct-v0:2", max_tokens: int = 900):
-    body = {"prompt": prompt_text, "max_tokens": max_tokens, "temperature": 0.2}
-    resp = bedrock.invoke_model(
-        modelId=model_id,
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps(body)
-    )
-    raw = resp["body"].read().decode("utf-8")
+@span("bedrock.generate")
+def call_bedrock_model(prompt_text: str, model_id: str = MODEL_ID, max_tokens: int = MAX_TOKENS,
+                       priority: str = "interactive"):
+    body = {"prompt": prompt_text, "max_tokens": max_tokens, "temperature": TEMPERATURE}
+    raw = gateway.invoke(model_id, body, priority=priority)
     try:
         parsed = json.loads(raw)
         if "outputs" in parsed:
@@ -107,56 +178,127 @@ def call_bedrock_model(prompt_text: str, model_id: str = "mistral.mistral-7b-ins
     except Exception:
         return raw
 
+def _stream_text(event):
+    chunk = json.loads(event["chunk"]["bytes"].decode("utf-8"))
+    if "outputs" in chunk:
+        return "".join(o.get("text") or o.get("outputText", "") for o in chunk["outputs"])
+    return chunk.get("outputText") or chunk.get("text") or chunk.get("completion") or ""
+
+def stream_bedrock_model(prompt_text: str, model_id: str = MODEL_ID, max_tokens: int = MAX_TOKENS,
+                         priority: str = "interactive"):
+    """Yield generated text deltas as Bedrock produces them."""
+    body = {"prompt": prompt_text, "max_tokens": max_tokens, "temperature": TEMPERATURE}
+    for event in gateway.invoke_stream(model_id, body, priority=priority):
+        if "chunk" not in event:
+            # modelStreamErrorException, throttlingException, ...
+            name, detail = next(iter(event.items()))
+            raise HTTPException(status_code=502, detail=f"{name}: {detail.get('message', detail)}")
+        text = _stream_text(event)
+        if text:
+            TOKENS.inc(estimate_tokens(text), direction="completion")
+            yield text
+
 # =========================================
 # 📄 SAVE AS PDF
 # =========================================
-def save_text_as_pdf(text: str, filename: str):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 8, text)
-    pdf.output(filename)
+@span("pdf.render")
+def render_text_pdf(text: str, title: str = None) -> io.BytesIO:
+    """Typeset generated paper text as a two-column IEEE-style PDF held in memory."""
+    title, sections = paper_sections(text, title)
+    buffer = io.BytesIO(render_pdf(sections, title))
+    BYTES.inc(buffer.getbuffer().nbytes, kind="pdf")
+    return buffer
+
+def save_text_as_pdf(text: str, filename: str, title: str = None):
+    with open(filename, "wb") as fh:
+        fh.write(render_text_pdf(text, title).getbuffer())
     return filename
 
 # =========================================
 # ☁️ UPLOAD TO S3
 # =========================================
-def upload_file_to_s3(local_path: str, bucket: str, object_name: str):
+@span("s3.upload")
+def upload_file_to_s3(source, bucket: str, object_name: str):
+    """Upload a path or a binary file object; large objects go up as concurrent multipart parts."""
+    s3 = get_client("s3")
     try:
-        s3.upload_file(local_path, bucket, object_name)
+        if isinstance(source, (str, os.PathLike)):
+            BYTES.inc(os.path.getsize(source), kind="s3_upload")
+            s3.upload_file(source, bucket, object_name, Config=transfer_config())
+        else:
+            source.seek(0, os.SEEK_END)
+            BYTES.inc(source.tell(), kind="s3_upload")
+            source.seek(0)
+            s3.upload_fileobj(source, bucket, object_name, Config=transfer_config(),
+                              ExtraArgs={"ContentType": "application/pdf"})
     except ClientError as e:
         raise HTTPException(status_code=500, detail=str(e))
-    return s3.generate_presigned_url(
+    return presign_url(bucket, object_name)
+
+def presign_url(bucket: str, object_name: str):
+    return get_client("s3").generate_presigned_url(
         'get_object',
         Params={'Bucket': bucket, 'Key': object_name},
         ExpiresIn=S3_PRESIGN_EXPIRY
     )
 
 # =========================================
-# 🧾 RESEARCH ENDPOINT
+# 🧾 RESEARCH PIPELINE
 # =========================================
-@app.post("/research/")
-def generate_research(data: PromptRequest):
-    topic = data.prompt.strip()
-    if not topic:
-        raise HTTPException(status_code=400, detail="Prompt cannot be empty.")
+result_cache = ResultCache()
 
-    papers = fetch_arxiv(topic)
+def research_cache_key(topic: str, papers: list):
+    params = {"model_id": MODEL_ID, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE}
+    return result_key(topic, [p.get("id") or p.get("url") or p["title"] for p in papers], params)
+
+def from_cache(result: dict, how: str):
+    """Copy a cached result with a freshly presigned URL for its S3 object."""
+    result = dict(result)
+    result["s3_url"] = presign_url(S3_BUCKET, result["s3_key"])
+    result["cache"] = how
+    return result
+
+def run_research(topic: str, progress=lambda stage: None):
+    progress("fetching")
+    papers, sources = retrieve_papers(topic)
     if not papers:
-        papers = [{"source": "none", "title": topic, "summary": ""}]
+        papers = [{"source": "none", "title": topic, "abstract": ""}]
+
+    def generate():
+        progress("generating")
+        prompt_text, prompt_report = build_ieee_prompt_report(topic, papers)
+        ai_text = call_bedrock_model(prompt_text)
+        return dict(publish_paper(topic, papers, ai_text, progress), prompt=prompt_report)
 
-    prompt_text = build_ieee_prompt(topic, papers)
-    ai_text = call_bedrock_model(prompt_text)
+    result, how = result_cache.get_or_compute(research_cache_key(topic, papers), generate,
+                                              on_wait=lambda: progress("waiting"))
+    result = dict(result, cache=how) if how == "computed" else from_cache(result, how)
+    result["topic"] = topic
+    result["sources"] = sources
+    return result
 
+def publish_paper(topic: str, papers: list, ai_text: str, progress=lambda stage: None):
+    progress("rendering")
+    filename, pdf_buffer = render_paper(topic, ai_text)
+
+    progress("uploading")
+    return store_paper(topic, papers, ai_text, filename, pdf_buffer)
+
+def render_paper(topic: str, ai_text: str):
     unique_id = uuid.uuid4().hex[:8]
     safe_title = "".join(c if c.isalnum() or c in (" ", "_") else "_" for c in topic).strip().replace(" ", "_")
     filename = f"{safe_title}_{unique_id}.pdf"
-    local_path = f"/tmp/{filename}" if os.name != 'nt' else filename
+    return filename, render_text_pdf(ai_text, title=topic)
 
-    save_text_as_pdf(ai_text, local_path)
+def store_paper(topic: str, papers: list, ai_text: str, filename: str, pdf_buffer: io.BytesIO):
     s3_key = f"generated/{filename}"
-    s3_url = upload_file_to_s3(local_path, S3_BUCKET, s3_key)
+    s3_url = upload_file_to_s3(pdf_buffer, S3_BUCKET, s3_key)
+    manifest.record(s3_key, topic, size=pdf_buffer.getbuffer().nbytes,
+                    paper_ids=[p.get("id") or p.get("url") or p["title"] for p in papers])
+    try:
+        chat_store.add_paper(s3_key, topic, ai_text, papers)
+    except Exception:
+        log.exception("chunk indexing failed for %s", s3_key)
 
     return {
         "topic": topic,
@@ -165,23 +307,289 @@ def generate_research(data: PromptRequest):
         "s3_url": s3_url,
         "generated_at": datetime.utcnow().isoformat(),
         "filename": filename,
+        "s3_key": s3_key,
+        "paper_id": s3_key,
+        "pdf_bytes": pdf_buffer.getbuffer().nbytes,
         "ai_text": ai_text
     }
 
+def run_research_job(job):
+    """Job handler: run one research request under a trace keyed by the job id."""
+    trace, token = start_trace(job.id)
+    try:
+        result = run_research(job.payload["topic"], job.progress)
+    finally:
+        end_trace(token)
+    return dict(result, timing=trace.timing())
+
+research_jobs = JobQueue(run_research_job)
+
+registry.callback_gauge("research_jobs", "Research job queue occupancy.", lambda: {
+    (("state", k),): v for k, v in research_jobs.stats().items() if k in ("running", "queued")})
+registry.callback_gauge("result_cache_items", "Entries in the research result cache.",
+                        lambda: {(): result_cache.snapshot()["size"]})
+registry.callback_gauge("bedrock_concurrency_limit", "Bedrock gateway AIMD concurrency limit.",
+                        lambda: {(): gateway.concurrency.limit})
+registry.callback_gauge("bedrock_in_flight", "Bedrock calls currently admitted.",
+                        lambda: {(): gateway.concurrency.in_flight})
+registry.callback_gauge("bedrock_waiting", "Bedrock calls waiting for admission, by priority lane.",
+                        lambda: {(("lane", lane),): n for lane, n in gateway.concurrency.waiting().items()})
+
+# =========================================
+# 🧾 RESEARCH ENDPOINTS
+# =========================================
+@app.post("/research/", status_code=202)
+def generate_research(data: PromptRequest):
+    """Queue a research job; poll GET /research/{job_id} for progress and result."""
+    topic = data.prompt.strip()
+    if not topic:
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty.")
+    try:
+        job = research_jobs.submit("research", {"topic": topic})
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Research queue is full, retry later.",
+                            headers={"Retry-After": "10"})
+    return {"job_id": job.id, "status": job.status, "status_url": f"/research/{job.id}"}
+
+@app.get("/research/{job_id}")
+def research_status(job_id: str):
+    job = research_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job.to_dict()
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _lead_stream(topic: str, papers: list, sources: dict, key: str, trace: Trace, emit):
+    t0 = time.perf_counter()
+    try:
+        parts, line = [], ""
+        prompt_text, prompt_report = build_ieee_prompt_report(topic, papers)
+        emit(_sse("prompt", prompt_report))
+        t_stream = time.perf_counter()
+        for delta in stream_bedrock_model(prompt_text):
+            parts.append(delta)
+            emit(_sse("token", {"text": delta}))
+            line += delta
+            while "\n" in line:
+                done, line = line.split("\n", 1)
+                section = section_of(done)
+                if section:
+                    emit(_sse("section", {"name": section}))
+
+        record("bedrock.stream", time.perf_counter() - t_stream, trace=trace)
+        emit(_sse("stage", {"stage": "publishing"}))
+        result = dict(publish_paper(topic, papers, "".join(parts)), prompt=prompt_report)
+    except Exception as e:
+        result_cache.finish(key, error=e)
+        emit(_sse("error", {"detail": e.detail if isinstance(e, HTTPException) else str(e)}))
+    else:
+        result_cache.finish(key, result, time.perf_counter() - t0)
+        emit(_sse("done", dict(result, cache="computed", sources=sources, timing=trace.timing())))
+    finally:
+        emit(None)
+
+def research_events(topic: str):
+    # Each chunk of a streaming body may run in a fresh context, so the trace is passed explicitly.
+    trace = Trace()
+    try:
+        papers, sources = trace.run(retrieve_papers, topic)
+        if not papers:
+            papers = [{"source": "none", "title": topic, "abstract": ""}]
+        yield _sse("papers", papers)
+        yield _sse("sources", sources)
+
+        key = research_cache_key(topic, papers)
+        how, value = result_cache.claim(key)
+        while how == "follow":
+            # The same topic is already generating (streamed or as a job): wait and replay its text.
+            yield _sse("stage", {"stage": "waiting"})
+            try:
+                how, value = "coalesced", result_cache.wait(key, value)
+            except Exception:
+                how, value = result_cache.claim(key)  # the leader failed: take over
+        if how != "lead":
+            yield _sse("token", {"text": value["ai_text"]})
+            yield _sse("done", dict(from_cache(value, how), topic=topic, sources=sources))
+            return
+
+        # Generate on a separate thread: if this client disconnects, the paper is still finished
+        # and cached, and requests waiting on this one are released.
+        events = queue.Queue()
+        threading.Thread(target=trace.run, args=(_lead_stream, topic, papers, sources, key, trace, events.put),
+                         name="research-stream", daemon=True).start()
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield event
+    except HTTPException as e:
+        yield _sse("error", {"detail": e.detail})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+
+@app.post("/research/stream")
+def stream_research(data: PromptRequest):
+    """Server-Sent Events: papers, token deltas, section markers, then the published result."""
+    topic = data.prompt.strip()
+    if not topic:
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty.")
+    return StreamingResponse(research_events(topic), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# =========================================
+# 📦 BATCH RESEARCH
+# =========================================
+# Guards a batch item's "lead"/"dropped" flags so a cancelled batch never claims a flight it won't finish.
+_batch_flights = threading.Lock()
+
+def _batch_retrieve(state: dict):
+    topic = state["topic"]
+    papers, state["sources"] = retrieve_papers(topic)
+    state["papers"] = papers or [{"source": "none", "title": topic, "abstract": ""}]
+    state["key"] = key = research_cache_key(topic, state["papers"])
+    while True:
+        with _batch_flights:
+            if state.get("dropped"):
+                return state
+            how, value = result_cache.claim(key)
+            if how == "lead":
+                state["lead"] = True
+        if how != "follow":
+            break
+        # The same topic is generating elsewhere (a job, a stream or another batch): wait for it.
+        try:
+            how, value = "coalesced", result_cache.wait(key, value)
+            break
+        except Exception:
+            continue  # the leader failed: claim again and take over
+    if how != "lead":
+        state["result"] = dict(from_cache(value, how), topic=topic)
+    state["started"] = time.perf_counter()
+    return state
+
+def _batch_generate(state: dict):
+    prompt_text, state["prompt"] = build_ieee_prompt_report(state["topic"], state["papers"])
+    state["ai_text"] = call_bedrock_model(prompt_text, priority="batch")
+    return state
+
+def _batch_render(state: dict):
+    state["filename"], state["pdf"] = render_paper(state["topic"], state["ai_text"])
+    return state
+
+def _batch_upload(state: dict):
+    result = store_paper(state["topic"], state["papers"], state["ai_text"], state["filename"], state.pop("pdf"))
+    result["prompt"] = state["prompt"]
+    with _batch_flights:
+        lead = state.pop("lead", False)
+    if lead:
+        result_cache.finish(state["key"], result, time.perf_counter() - state["started"])
+    else:  # the batch was cancelled mid-upload and already released the flight
+        result_cache.put(state["key"], result, time.perf_counter() - state["started"])
+    state["result"] = dict(result, cache="computed")
+    return state
+
+def _batch_release(state: dict, error: Exception):
+    """Fail the flight this item leads, if any, so requests waiting on it take over."""
+    with _batch_flights:
+        state["dropped"] = True
+        lead = state.pop("lead", False)
+    if lead:
+        result_cache.finish(state["key"], error=error)
+
+def _batch_pipeline():
+    return Pipeline([
+        Stage("retrieval", _batch_retrieve, BATCH_WORKERS["retrieval"]),
+        Stage("generation", _batch_generate, BATCH_WORKERS["generation"]),
+        Stage("rendering", _batch_render, BATCH_WORKERS["rendering"]),
+        Stage("upload", _batch_upload, BATCH_WORKERS["upload"]),
+    ], is_done=lambda state: "result" in state,
+       on_drop=lambda state: _batch_release(state, RuntimeError("batch cancelled")))
+
+async def _cancel_on_disconnect(request: Request, lines, cancel):
+    # Starlette stops pulling a sync iterator when the client leaves but never closes it, and under
+    # ASGI 2.4 only notices on the next write; watch for the disconnect and stop the work behind it.
+    async def watch():
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+        cancel()
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        async for line in iterate_in_threadpool(lines):
+            yield line
+    finally:
+        watcher.cancel()
+        cancel()
+
+def research_batch_lines(topics: list, pipeline: Pipeline = None):
+    # Topics that normalize alike run once; every duplicate gets the same result.
+    unique, copies = [], {}
+    for index, topic in enumerate(topics):
+        norm = normalize_topic(topic) or topic
+        if norm not in copies:
+            copies[norm] = []
+            unique.append((norm, topic))
+        copies[norm].append(index)
+
+    pipeline = pipeline or _batch_pipeline()
+    for position, state, error in pipeline.run({"topic": topic} for _, topic in unique):
+        if error is not None:
+            _batch_release(state, error)
+        for n, index in enumerate(copies[unique[position][0]]):
+            line = {"index": index, "topic": topics[index]}
+            if error is not None:
+                line.update(status="failed", error=getattr(error, "detail", None) or str(error))
+            else:
+                result = dict(state["result"], sources=state.get("sources"), topic=topics[index])
+                if n:
+                    result["cache"] = "coalesced"
+                line.update(status="done", result=result)
+            yield json.dumps(line) + "\n"
+    yield json.dumps({"summary": dict(pipeline.report(), topics=len(topics), unique_topics=len(unique))}) + "\n"
+
+@app.post("/research/batch")
+def research_batch(data: BatchRequest, request: Request):
+    """Run many topics through the staged pipeline, streaming NDJSON results as each finishes.
+
+    The last line is ``{"summary": ...}`` with per-stage utilization.
+    """
+    topics = [t.strip() for t in data.prompts if t.strip()]
+    if not topics:
+        raise HTTPException(status_code=400, detail="At least one prompt is required.")
+    if len(topics) > BATCH_MAX_TOPICS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_TOPICS} prompts per batch.")
+    pipeline = _batch_pipeline()
+    return StreamingResponse(_cancel_on_disconnect(request, research_batch_lines(topics, pipeline), pipeline.cancel),
+                             media_type="application/x-ndjson")
+
 # =========================================
 # 💬 CHATBOT ENDPOINT
 # =========================================
 @app.post("/chatbot/")
 def chatbot(req: ChatRequest):
+    """Answer a question about a stored paper using only its most relevant chunks."""
+    question = req.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
     try:
-        question = req.question
-        context = req.context
-        prompt = f"Context:\n{context}\n\nQuestion: {question}\n\nAnswer in IEEE academic tone."
-
-        # Temporary mock answer (we’ll integrate Bedrock next)
-        answer = f"This is an AI-generated answer for: '{question}' based on provided context."
-
-        return {"answer": answer}
+        if req.paper_id:
+            chunks = chat_store.retrieve(req.paper_id, question)
+            if not chunks:
+                raise HTTPException(status_code=404, detail="Unknown paper id.")
+        elif req.context:
+            chunks = [{"section": "context", "text": req.context[:8000]}]
+        else:
+            raise HTTPException(status_code=400, detail="paper_id is required.")
+        turns = chat_store.recent_turns(req.session_id) if req.session_id else []
+        prompt = build_chat_prompt(question, chunks, turns)
+        answer = call_bedrock_model(prompt, max_tokens=CHAT_MAX_TOKENS).strip()
+        if req.session_id:
+            chat_store.add_turn(req.session_id, req.paper_id, question, answer)
+        return {"answer": answer, "sources": [{"section": c["section"], "score": c.get("score")} for c in chunks]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -189,16 +597,31 @@ def chatbot(req: ChatRequest):
 # 🗂️ HISTORY ENDPOINT
 # =========================================
 @app.get("/history/")
-def list_pdfs():
-    """List generated research PDFs from S3."""
-    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix="generated/")
-    if "Contents" not in response:
-        return {"files": []}
+def list_pdfs(request: Request, response: Response, limit: int = 20, cursor: str = None,
+              prefix: str = None, q: str = None):
+    """List generated research PDFs from the local manifest, newest first.
+
+    Supports cursor pagination, topic prefix (``prefix``) and full-text (``q``)
+    filters, and conditional requests via ETag / If-None-Match.
+    """
+    limit = max(1, min(limit, 100))
+    etag = manifest.etag(limit, cursor, prefix, q)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        rows, next_cursor = manifest.page(limit=limit, cursor=cursor, prefix=prefix, q=q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     files = [{
-        "file_name": obj["Key"],
-        "last_modified": str(obj["LastModified"]),
-        "url": f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{obj['Key']}"
-    } for obj in response["Contents"]]
+        "file_name": row["key"],
+        "topic": row["topic"],
+        "size": row["size"],
+        "paper_ids": row["paper_ids"],
+        "last_modified": datetime.utcfromtimestamp(row["created_at"]).isoformat(),
+        "url": f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{row['key']}"
+    } for row in rows]
 
-    return {"files": sorted(files, key=lambda x: x["last_modified"], reverse=True)}
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return {"files": files, "next_cursor": next_cursor}
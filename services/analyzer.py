@@ -1,13 +1,34 @@
-# services/analyzer.py
-from services.bedrock_client import invoke_mistral
-import json, textwrap
+from services.bedrock_client import MODEL_ID, invoke_mistral
+from services.json_repair import loads_lenient
+from services.paper_store import get_store
+from services.prompt_builder import builder, estimate_tokens
+from services.tracing import span
+from services.vector_index import paper_key
+from concurrent.futures import ThreadPoolExecutor
+import contextvars, os, textwrap
+
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "auto")  # auto | single | map_reduce
+ANALYSIS_MAX_PAPERS = int(os.getenv("ANALYSIS_MAX_PAPERS", 100))
+ANALYSIS_MAP_WORKERS = int(os.getenv("ANALYSIS_MAP_WORKERS", 8))
+# Input tokens one reduce call may carry; larger digest sets are reduced in groups first.
+ANALYSIS_REDUCE_BUDGET = int(os.getenv("ANALYSIS_REDUCE_BUDGET", 3000))
+MAX_REDUCE_LEVELS = 4
+DIGEST_VERSION = 1  # bump when the digest prompt changes
+DIGEST_MAX_TOKENS = 250
+RESULT_FIELDS = ("summary", "limitations", "innovations")
+DIGEST_FIELDS = ("problem", "method", "findings", "limitations")
+GROUP_FIELDS = ("summary", "limitations", "themes")
 
 def build_analysis_prompt(topic, top_papers):
     # top_papers: list of dicts {title, abstract, url, year}
+    # abstracts are trimmed to the shared prompt token budget first
+    top_papers, _ = builder.fit(topic, top_papers, fixed_text=_analysis_template(topic, ""))
     docs = []
     for i,p in enumerate(top_papers, 1):
         docs.append(f"Paper {i} Title: {p['title']}\nAbstract: {p['abstract']}\nURL: {p.get('url','')}\n")
-    docs_block = "\n\n".join(docs)
+    return _analysis_template(topic, "\n\n".join(docs))
+
+def _analysis_template(topic, docs_block):
     prompt = f"""
 You are an expert academic research assistant.
 
@@ -25,18 +46,161 @@ Return only JSON.
 """
     return textwrap.dedent(prompt)
 
-def analyze_topic(topic, papers, top_k=5):
-    top_papers = papers[:top_k]
-    prompt = build_analysis_prompt(topic, top_papers)
-    raw = invoke_mistral(prompt, max_tokens=1200, temp=0.2)
-    # raw may be {"text":"..."} or a dict or plain string; normalize:
-    text = raw.get("text") if isinstance(raw, dict) else raw
-    if isinstance(text, dict):
-        return text
-    elif isinstance(text, str):
-        # model should return JSON string — try parse
-        try:
-            return json.loads(text)
-        except Exception as e:
-            # fallback: wrap raw text in diagnostic structure
+def _digest_template(paper):
+    prompt = f"""
+You are an expert academic research assistant. Digest the paper below into JSON with these fields:
+- problem: the problem addressed, in one sentence.
+- method: the approach, in one sentence.
+- findings: the main result, in one sentence.
+- limitations: an array of up to 2 short limitations.
+
+Title: {paper.get('title', '')}
+Abstract: {' '.join((paper.get('abstract') or paper.get('summary') or '').split()[:400])}
+
+Return only JSON.
+"""
+    return textwrap.dedent(prompt)
+
+def _group_template(topic, lines):
+    prompt = f"""
+You are an expert academic research assistant. The digests below cover part of the literature on "{topic}".
+Produce JSON with these fields:
+- summary: 2-3 sentences synthesizing these papers.
+- limitations: an array of up to 4 recurring limitations.
+- themes: an array of up to 4 short method or result themes.
+
+DIGESTS:
+{chr(10).join(lines)}
+
+Return only JSON.
+"""
+    return textwrap.dedent(prompt)
+
+def _text_of(raw):
+    # invoke_mistral returns the parsed Bedrock body ({"outputs": [...]}) or {"text": ...}
+    if isinstance(raw, dict) and "outputs" in raw:
+        return "\n".join(o.get("text") or o.get("outputText", "") for o in raw["outputs"])
+    return raw.get("text") if isinstance(raw, dict) else raw
+
+def _ask_json(prompt, fields, max_tokens, temp=0.2):
+    text = _text_of(invoke_mistral(prompt, max_tokens=max_tokens, temp=temp))
+    value, status = loads_lenient(text, fields)
+    if isinstance(value, dict):
+        return value, status, text
+    return None, "failed", text
+
+def _in_context(fn, *args):
+    # Pool threads start with an empty context; carry the caller's trace over.
+    return contextvars.copy_context().run(fn, *args)
+
+def _digest_line(i, paper, digest):
+    lims = digest.get("limitations") or []
+    lims = "; ".join(lims) if isinstance(lims, list) else str(lims)
+    year = f" ({paper['year']})" if paper.get("year") else ""
+    return (f"[{i}] {paper.get('title', '')}{year}. Problem: {digest.get('problem', '')} "
+            f"Method: {digest.get('method', '')} Findings: {digest.get('findings', '')} Limitations: {lims}")
+
+@span("analysis.map")
+def map_digests(papers, workers=ANALYSIS_MAP_WORKERS):
+    """Per-paper digests, reused across topics via the paper store. Returns ``(pairs, stats)``."""
+    store = get_store()
+    keys = [paper_key(p) for p in papers]
+    digests = store.get_digests(keys, MODEL_ID, DIGEST_VERSION)
+    stats = {"cached": len(digests), "computed": 0, "repaired": 0, "failed": 0}
+    todo = {k: p for k, p in zip(keys, papers) if k not in digests}
+
+    def one(paper):
+        digest, status, _ = _ask_json(_digest_template(paper), DIGEST_FIELDS, DIGEST_MAX_TOKENS, temp=0.0)
+        return {k: digest[k] for k in DIGEST_FIELDS if digest and digest.get(k)}, status
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as pool:
+            futures = {k: pool.submit(_in_context, one, p) for k, p in todo.items()}
+            for k, future in futures.items():
+                try:
+                    digest, status = future.result()
+                except Exception:
+                    digest, status = None, "failed"
+                if not digest:
+                    stats["failed"] += 1
+                    continue
+                digests[k] = digest
+                stats["computed"] += 1
+                stats["repaired"] += status != "ok"
+                if status in ("ok", "repaired"):  # partial digests are used once, not cached
+                    store.put_digest(k, MODEL_ID, DIGEST_VERSION, digest)
+    return [(p, digests[k]) for k, p in zip(keys, papers) if k in digests], stats
+
+def _pack(lines, budget):
+    groups, current, used = [], [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    return groups + ([current] if current else [])
+
+@span("analysis.reduce")
+def reduce_digests(topic, lines, budget=ANALYSIS_REDUCE_BUDGET, workers=ANALYSIS_MAP_WORKERS):
+    """Synthesize digests; while they overflow ``budget``, reduce groups to intermediate syntheses first."""
+    # Lines and syntheses are capped at a quarter of the budget, so each group
+    # combines at least four of them and every level shrinks the input.
+    line_cap = max(25, budget // 4) * 4  # characters
+    lines = [line[:line_cap] for line in lines]
+    levels = 0
+    while estimate_tokens("\n".join(lines)) > budget and levels < MAX_REDUCE_LEVELS:
+        groups = _pack(lines, budget)
+        if len(groups) == 1:
+            break
+        levels += 1
+
+        def one(group):
+            out, _, _ = _ask_json(_group_template(topic, group), GROUP_FIELDS, max(100, budget // 4))
+            if not out:
+                return None
+            lims = out.get("limitations") or []
+            themes = out.get("themes") or []
+            return (f"Summary: {out.get('summary', '')} Limitations: "
+                    f"{'; '.join(map(str, lims)) if isinstance(lims, list) else lims} Themes: "
+                    f"{'; '.join(map(str, themes)) if isinstance(themes, list) else themes}")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups)))) as pool:
+            reduced = list(pool.map(lambda g: _in_context(one, g), groups))
+        lines = [f"[group {i}] {r}"[:line_cap] for i, r in enumerate(reduced, 1) if r]
+        if not lines:
+            raise RuntimeError("every intermediate reduce failed")
+    # Still too long after MAX_REDUCE_LEVELS: keep what fits rather than overflow the context.
+    lines = _pack(lines, budget)[0]
+    result, status, text = _ask_json(_analysis_template(topic, "\n".join(lines)), RESULT_FIELDS, 1200)
+    return result, status, text, levels
+
+@span("analysis")
+def analyze_topic(topic, papers, top_k=5, mode=ANALYSIS_MODE):
+    """Summary, limitations and innovations for a topic.
+
+    ``single`` sends the first ``top_k`` abstracts in one prompt. ``map_reduce``
+    digests up to ANALYSIS_MAX_PAPERS papers in parallel (digests are cached
+    per paper and model) and synthesizes the digests, hierarchically when they
+    exceed the reduce budget. ``auto`` picks map_reduce when there are more
+    than ``top_k`` papers. Malformed JSON is repaired or partially recovered.
+    """
+    if mode == "auto":
+        mode = "map_reduce" if len(papers) > top_k else "single"
+    if mode == "single":
+        prompt = build_analysis_prompt(topic, papers[:top_k])
+        result, status, text = _ask_json(prompt, RESULT_FIELDS, 1200)
+        if result is None:
             return {"error": "parse_failed", "raw": text}
+        return dict(result, parse=status) if status == "partial" else result
+
+    pairs, digest_stats = map_digests(papers[:ANALYSIS_MAX_PAPERS])
+    if not pairs:
+        return {"error": "no_digests", "analysis": {"mode": mode, "digests": digest_stats}}
+    lines = [_digest_line(i, p, d) for i, (p, d) in enumerate(pairs, 1)]
+    result, status, text, levels = reduce_digests(topic, lines)
+    report = {"mode": mode, "papers": len(pairs), "digests": digest_stats, "reduce_levels": levels, "parse": status}
+    if result is None:
+        return {"error": "parse_failed", "raw": text, "analysis": report}
+    return dict(result, analysis=report)
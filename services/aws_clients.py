@@ -0,0 +1,102 @@
+# services/aws_clients.py
+import os
+import threading
+
+REGION = os.getenv("AWS_REGION", "us-east-1")
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 50))
+RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", 3))
+CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", 120))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024))
+USE_FAKE_BEDROCK = os.getenv("BEDROCK_FAKE", "0") == "1"
+
+
+class ClientRegistry:
+    """Per-process boto3 clients, built on first use and shared by every module.
+
+    boto3 is imported and a client constructed only when something asks for
+    it, so importing the app stays cheap. Clients are thread-safe but must
+    not cross a fork: the registry is emptied in the child (and whenever the
+    PID changes), so each uvicorn/gunicorn worker builds its own pools.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._session = None
+        self._clients = {}
+
+    def reset(self):
+        # Called in a freshly forked child: the parent's lock may be held, so replace it.
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._session = None
+        self._clients = {}
+
+    def _config(self, max_attempts, retry_mode):
+        from botocore.config import Config
+
+        return Config(
+            region_name=REGION,
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=CONNECT_TIMEOUT,
+            read_timeout=READ_TIMEOUT,
+            retries={"mode": retry_mode, "max_attempts": max_attempts},
+        )
+
+    def get(self, service, max_attempts=None, retry_mode=None):
+        """Shared client for ``service``; distinct retry settings get their own client."""
+        if self._pid != os.getpid():
+            self.reset()
+        key = (service, max_attempts or MAX_ATTEMPTS, retry_mode or RETRY_MODE)
+        client = self._clients.get(key) or self._clients.get((service, None, None))
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self._build(*key)
+            return client
+
+    def _build(self, service, max_attempts, retry_mode):
+        if service == "bedrock-runtime" and USE_FAKE_BEDROCK:
+            from services.fake_bedrock import FakeBedrockRuntime
+            return FakeBedrockRuntime()
+        if self._session is None:
+            import boto3
+            # Sessions are not thread-safe; one per process, used under the lock.
+            self._session = boto3.session.Session(region_name=REGION)
+        return self._session.client(service, config=self._config(max_attempts, retry_mode))
+
+    def set(self, service, client):
+        """Install a client (e.g. an offline fake) for every caller of ``service``."""
+        with self._lock:
+            self._clients = {k: v for k, v in self._clients.items() if k[0] != service}
+            self._clients[(service, None, None)] = client
+
+    def snapshot(self):
+        return {"pid": self._pid, "clients": sorted(f"{s}:{a}:{m}" for s, a, m in self._clients)}
+
+
+clients = ClientRegistry()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=clients.reset)
+
+
+def get_client(service, max_attempts=None, retry_mode=None):
+    return clients.get(service, max_attempts, retry_mode)
+
+
+_transfer_config = None
+
+
+def transfer_config():
+    """Multipart settings shared by every S3 upload path (built lazily, like the clients)."""
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+        _transfer_config = TransferConfig(multipart_threshold=S3_MULTIPART_THRESHOLD,
+                                          multipart_chunksize=S3_MULTIPART_THRESHOLD,
+                                          max_concurrency=4, use_threads=True)
+    return _transfer_config
@@ -1,15 +1,13 @@
 # services/bedrock_client.py
-import boto3, json, os
-REGION = os.getenv("AWS_REGION", "us-east-1")
-client = boto3.client("bedrock-runtime", region_name=REGION)
+import json
+from services.bedrock_gateway import gateway
 
-def invoke_mistral(prompt, max_tokens=900, temp=0.2):
+MODEL_ID = "mistral.mistral-7b-instruct-v0:2"
+
+def invoke_mistral(prompt, max_tokens=900, temp=0.2, priority="batch"):
+    """Invoke Mistral through the shared gateway. Analysis work defaults to the batch lane."""
     body = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temp}
-    resp = client.invoke_model(
-        modelId="mistral.mistral-7b-instruct-v0:2",
-        body=json.dumps(body).encode("utf-8")
-    )
-    raw = resp['body'].read().decode('utf-8')
+    raw = gateway.invoke(MODEL_ID, body, priority=priority)
     # raw could be a JSON string or plain text; try parse safely:
     try:
         return json.loads(raw)
@@ -0,0 +1,187 @@
+# services/bedrock_gateway.py
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from services.aws_clients import get_client
+from services.http_client import backoff_delay
+from services.prompt_builder import estimate_tokens
+from services.rate_limit import TokenBucket
+from services.tracing import TOKENS, span
+
+REQUESTS_PER_SEC = float(os.getenv("BEDROCK_RPS", 5))
+TOKENS_PER_MIN = float(os.getenv("BEDROCK_TPM", 200000))
+INITIAL_CONCURRENCY = int(os.getenv("BEDROCK_INITIAL_CONCURRENCY", 4))
+MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", 16))
+MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", 4))
+
+# Lower value is served first.
+PRIORITIES = {"interactive": 0, "batch": 1}
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+def is_throttle(error):
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLE_CODES
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit with priority-ordered admission.
+
+    Each success raises the limit by ``1 / limit`` (about +1 per window of
+    calls); each throttle halves it.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=1, maximum=MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority):
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            while self._waiters[0] != entry or self.in_flight >= int(self.limit):
+                self._cond.wait()
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            self._cond.notify_all()
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def waiting(self):
+        with self._cond:
+            counts = {name: 0 for name in PRIORITIES}
+            names = {v: k for k, v in PRIORITIES.items()}
+            for priority, _ in self._waiters:
+                counts[names[priority]] += 1
+            return counts
+
+
+class BedrockGateway:
+    """Single entry point for Bedrock model invocations.
+
+    Calls are admitted in priority order under an adaptive concurrency limit,
+    then pass a request-rate bucket and an estimated-token bucket. Throttling
+    errors shrink the limit and are retried with jittered backoff.
+    """
+
+    def __init__(self, client=None, rps=REQUESTS_PER_SEC, tpm=TOKENS_PER_MIN, max_attempts=MAX_ATTEMPTS,
+                 concurrency=None):
+        self._client = client
+        self.requests = TokenBucket(rps, max(1, int(rps)))
+        self.tokens = TokenBucket(tpm / 60.0, max(1, int(tpm / 6)))  # burst: ~10s of budget
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.max_attempts = max_attempts
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "failures": 0, "estimated_tokens": 0}
+
+    @property
+    def client(self):
+        # Throttles must reach the AIMD limit, so botocore does not retry underneath the gateway.
+        return self._client or get_client("bedrock-runtime", max_attempts=1, retry_mode="standard")
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, value in deltas.items():
+                self.stats[name] += value
+
+    def _admit(self, cost, priority):
+        with span("bedrock.admission"):
+            self.concurrency.acquire(PRIORITIES[priority])
+            self.requests.acquire()
+            self.tokens.acquire(n=cost)
+
+    def _call(self, operation, model_id, body, priority):
+        prompt_tokens = estimate_tokens(body.get("prompt") or body.get("inputText"))
+        cost = prompt_tokens + body.get("max_tokens", 0)
+        self._count(calls=1, estimated_tokens=cost)
+        TOKENS.inc(prompt_tokens, direction="prompt")
+        for attempt in range(self.max_attempts):
+            self._admit(cost, priority)
+            throttled = False
+            try:
+                return getattr(self.client, operation)(
+                    modelId=model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps(body),
+                )
+            except ClientError as e:
+                throttled = is_throttle(e)
+                if not throttled or attempt == self.max_attempts - 1:
+                    self._count(failures=1, throttled=int(throttled))
+                    raise
+                self._count(throttled=1, retries=1)
+            finally:
+                self.concurrency.release(throttled)
+            time.sleep(backoff_delay(attempt))
+
+    def invoke(self, model_id, body, priority="interactive"):
+        """Invoke a model and return the raw response body as text."""
+        resp = self._call("invoke_model", model_id, body, priority)
+        raw = resp["body"].read().decode("utf-8")
+        if "prompt" in body:
+            TOKENS.inc(estimate_tokens(raw), direction="completion")
+        return raw
+
+    def invoke_stream(self, model_id, body, priority="interactive"):
+        """Yield response-stream events. The concurrency slot is held until the stream ends."""
+        prompt_tokens = estimate_tokens(body.get("prompt"))
+        cost = prompt_tokens + body.get("max_tokens", 0)
+        self._count(calls=1, estimated_tokens=cost)
+        TOKENS.inc(prompt_tokens, direction="prompt")
+        for attempt in range(self.max_attempts):
+            self._admit(cost, priority)
+            throttled = started = False
+            try:
+                resp = self.client.invoke_model_with_response_stream(
+                    modelId=model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps(body),
+                )
+                for event in resp["body"]:
+                    if "throttlingException" in event:
+                        throttled = True
+                    started = True
+                    yield event
+                return
+            except ClientError as e:
+                throttled = is_throttle(e)
+                # Text already reached the caller, so a retry would duplicate it.
+                if not throttled or started or attempt == self.max_attempts - 1:
+                    self._count(failures=1, throttled=int(throttled))
+                    raise
+                self._count(throttled=1, retries=1)
+            finally:
+                self.concurrency.release(throttled)
+            time.sleep(backoff_delay(attempt))
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting(),
+        })
+        return stats
+
+
+gateway = BedrockGateway()
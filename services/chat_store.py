@@ -0,0 +1,143 @@
+# services/chat_store.py
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from services.embeddings import cosine_scores, embed_texts, top_k_indices
+from services.sections import split_sections
+from services.tracing import span
+
+CHAT_STORE_PATH = os.getenv("CHAT_STORE_PATH", os.path.join(".cache", "chat_store.sqlite3"))
+CHUNK_WORDS = int(os.getenv("CHAT_CHUNK_WORDS", 160))
+CHUNK_OVERLAP = int(os.getenv("CHAT_CHUNK_OVERLAP", 30))
+TOP_K = int(os.getenv("CHAT_TOP_K", 4))
+HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", 3))
+
+
+def _windows(words, size, overlap):
+    step = max(1, size - overlap)
+    for start in range(0, max(1, len(words) - overlap), step):
+        yield " ".join(words[start:start + size])
+
+
+def chunk_paper(ai_text, papers=()):
+    """Section-aware chunks of a generated paper plus one chunk per source abstract.
+
+    Returns ``[(section, text), ...]``. Long sections are split into
+    overlapping word windows so each chunk stays near ``CHUNK_WORDS``.
+    """
+    chunks = []
+    for section, body in split_sections(ai_text):
+        words = body.split()
+        if not words:
+            continue
+        for window in _windows(words, CHUNK_WORDS, CHUNK_OVERLAP):
+            chunks.append((section, window))
+    for i, p in enumerate(papers, 1):
+        abstract = p.get("abstract") or p.get("summary") or ""
+        if abstract:
+            words = f"Paper {i}: {p.get('title', '')}. {abstract}".split()
+            for window in _windows(words, CHUNK_WORDS, CHUNK_OVERLAP):
+                chunks.append((f"source paper {i}", window))
+    return chunks
+
+
+class ChatStore:
+    """Server-side store of generated papers, their embedded chunks and chat turns."""
+
+    def __init__(self, path=CHAT_STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY, topic TEXT, created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                paper_id TEXT NOT NULL, ord INTEGER NOT NULL, section TEXT, text TEXT NOT NULL,
+                vec BLOB NOT NULL, PRIMARY KEY (paper_id, ord)
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL, paper_id TEXT, question TEXT NOT NULL, answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS turns_session ON turns(session_id, created_at);
+        """)
+        self._db.commit()
+        self._matrices = {}  # paper_id -> (vectors, chunk rows); small per-paper working set
+
+    def has_paper(self, paper_id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM papers WHERE paper_id = ?", (paper_id,)).fetchone() is not None
+
+    def add_paper(self, paper_id, topic, ai_text, papers=()):
+        """Chunk and embed a paper once. Re-adding a known paper is a no-op."""
+        if self.has_paper(paper_id):
+            return 0
+        chunks = chunk_paper(ai_text, papers)
+        if not chunks:
+            return 0
+        vecs = embed_texts([f"{section}: {text}" for section, text in chunks])
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO papers (paper_id, topic, created_at) VALUES (?, ?, ?)",
+                             (paper_id, topic, time.time()))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (paper_id, ord, section, text, vec) VALUES (?, ?, ?, ?, ?)",
+                [(paper_id, i, section, text, np.asarray(v, dtype=np.float32).tobytes())
+                 for i, ((section, text), v) in enumerate(zip(chunks, vecs))],
+            )
+            self._db.commit()
+        return len(chunks)
+
+    def _paper_matrix(self, paper_id):
+        with self._lock:
+            cached = self._matrices.get(paper_id)
+            if cached is None:
+                rows = self._db.execute(
+                    "SELECT section, text, vec FROM chunks WHERE paper_id = ? ORDER BY ord", (paper_id,)).fetchall()
+                if not rows:
+                    return None
+                mat = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                cached = (mat, [(r[0], r[1]) for r in rows])
+                if len(self._matrices) >= 64:
+                    self._matrices.pop(next(iter(self._matrices)))
+                self._matrices[paper_id] = cached
+            return cached
+
+    @span("chat.retrieve")
+    def retrieve(self, paper_id, question, k=TOP_K):
+        """Top-k ``{"section", "text", "score"}`` chunks of a paper for a question."""
+        found = self._paper_matrix(paper_id)
+        if found is None:
+            return []
+        mat, rows = found
+        q = embed_texts([question])[0]
+        scores = cosine_scores(q, mat)
+        return [{"section": rows[i][0], "text": rows[i][1], "score": float(scores[i])}
+                for i in top_k_indices(scores, k)]
+
+    def add_turn(self, session_id, paper_id, question, answer):
+        with self._lock:
+            self._db.execute("INSERT INTO turns (session_id, paper_id, question, answer, created_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (session_id, paper_id, question, answer, time.time()))
+            self._db.commit()
+
+    def recent_turns(self, session_id, n=HISTORY_TURNS):
+        with self._lock:
+            rows = self._db.execute("SELECT question, answer FROM turns WHERE session_id = ? "
+                                    "ORDER BY created_at DESC LIMIT ?", (session_id, n)).fetchall()
+        return list(reversed(rows))
+
+
+def build_chat_prompt(question, chunks, turns=()):
+    context = "\n\n".join(f"[{c['section']}]\n{c['text']}" for c in chunks)
+    # Earlier answers are clipped so the prompt stays bounded however long the chat runs.
+    history = "".join(f"Q: {q}\nA: {' '.join(a.split()[:60])}\n" for q, a in turns)
+    return (f"Context:\n{context}\n\n"
+            + (f"Conversation so far:\n{history}\n" if history else "")
+            + f"Question: {question}\n\nAnswer in IEEE academic tone.")
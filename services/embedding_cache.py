@@ -0,0 +1,136 @@
+# services/embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))
+MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", 4096))
+DISK_MAX_BYTES = int(os.getenv("EMBED_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different abstracts share a key."""
+    return " ".join((text or "").split()).lower()
+
+
+def cache_key(model_id, text):
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: in-process LRU in front of a SQLite blob store.
+
+    Vectors are stored as float32 blobs. The disk tier evicts least recently
+    used rows once the total blob size passes ``disk_max_bytes``.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_items=MEMORY_ITEMS, disk_max_bytes=DISK_MAX_BYTES):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _conn(self):
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vec BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings(accessed)")
+            row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()
+            self._disk_bytes = row[0]
+        return self._db
+
+    def _remember(self, key, vec):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vec
+            db = self._conn()
+            row = db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            db.execute("UPDATE embeddings SET accessed = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            vec = np.frombuffer(row[0], dtype=np.float32)
+            self._remember(key, vec)
+            self.stats["disk_hits"] += 1
+            return vec
+
+    def put(self, key, vec):
+        vec = np.ascontiguousarray(vec, dtype=np.float32)
+        blob = vec.tobytes()
+        with self._lock:
+            self._remember(key, vec)
+            db = self._conn()
+            old = db.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vec, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            self._evict(db)
+            db.commit()
+        return vec
+
+    def _evict(self, db):
+        while self._disk_bytes > self.disk_max_bytes:
+            rows = db.execute("SELECT key, size FROM embeddings ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._lru.pop(key, None)
+                self._disk_bytes -= size
+                self.stats["evictions"] += 1
+                if self._disk_bytes <= self.disk_max_bytes:
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_items": len(self._lru),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+    return _default_cache
@@ -1,27 +1,136 @@
 # services/embeddings.py
-import boto3, json
+import json
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
+from services.aws_clients import get_client
+from services.embedding_cache import cache_key, get_cache
+from services.lexical import bm25_scores, rrf_scores
+from services.vector_index import get_index, paper_key
+from services.tracing import span
 
-REGION = os.getenv("AWS_REGION", "us-east-1")
 EMB_MODEL = "amazon.titan-embed-text-v1"  # confirm exact modelId in your account
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 8))
+RANK_PREFILTER_N = int(os.getenv("RANK_PREFILTER_N", 30))  # 0 = embed every candidate
+RANK_FUSION = os.getenv("RANK_FUSION", "rrf")  # rrf | cosine
 
-client = boto3.client("bedrock-runtime", region_name=REGION)
-
-def embed_text(text):
+def _invoke_embedding(text):
     body = {"inputText": text}
-    resp = client.invoke_model(modelId=EMB_MODEL, body=json.dumps(body).encode("utf-8"))
+    resp = get_client("bedrock-runtime").invoke_model(modelId=EMB_MODEL, body=json.dumps(body).encode("utf-8"))
     raw = json.loads(resp["body"].read().decode())
     # response format may vary; adjust if different. Look for 'embeddings' or 'embedding'
     emb = raw.get("embeddings") or raw.get("embedding") or raw.get("vector")
     return np.array(emb)
 
-def rank_papers_by_relevance(query, papers):
-    q_emb = embed_text(query)
-    scores = []
-    for p in papers:
-        a_emb = embed_text(p["abstract"][:2000])
-        sim = float(np.dot(q_emb, a_emb) / (np.linalg.norm(q_emb) * np.linalg.norm(a_emb)))
-        scores.append((sim, p))
-    scores.sort(reverse=True, key=lambda x: x[0])
-    return [p for s,p in scores]
+def embed_text(text, use_cache=True):
+    if not use_cache:
+        return _invoke_embedding(text)
+    cache = get_cache()
+    key = cache_key(EMB_MODEL, text)
+    vec = cache.get(key)
+    if vec is None:
+        vec = cache.put(key, _invoke_embedding(text))
+    return vec
+
+def embedding_cache_stats():
+    return get_cache().snapshot()
+
+@span("embeddings")
+def embed_texts(texts, max_workers=EMBED_CONCURRENCY, use_cache=True):
+    """Embed many texts, fetching only cache misses on a bounded thread pool.
+
+    Returns a list of vectors in input order; duplicate texts are embedded once.
+    """
+    texts = list(texts)
+    results = [None] * len(texts)
+    pending = {}
+    cache = get_cache() if use_cache else None
+    for i, text in enumerate(texts):
+        key = cache_key(EMB_MODEL, text)
+        vec = cache.get(key) if cache is not None else None
+        if vec is None:
+            pending.setdefault(key, (text, []))[1].append(i)
+        else:
+            results[i] = vec
+    if pending:
+        items = list(pending.items())
+        workers = max(1, min(max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            vecs = list(pool.map(lambda item: _invoke_embedding(item[1][0]), items))
+        for (key, (_, idxs)), vec in zip(items, vecs):
+            if cache is not None:
+                vec = cache.put(key, vec)
+            for i in idxs:
+                results[i] = vec
+    return results
+
+def cosine_scores(q_emb, doc_embs):
+    """Cosine similarity of one query vector against a stacked matrix of documents."""
+    mat = np.asarray(doc_embs, dtype=np.float32)
+    q = np.asarray(q_emb, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1) * np.linalg.norm(q)
+    norms[norms == 0] = 1.0
+    return (mat @ q) / norms
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first."""
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+def _abstract(p):
+    return (p.get("abstract") or p.get("summary") or "").strip()
+
+def _doc_text(p):
+    return f"{p.get('title') or ''}. {_abstract(p)}"
+
+def rank_papers_by_relevance(query, papers, top_k=None, search_corpus=False, corpus_k=10,
+                             prefilter_n=RANK_PREFILTER_N, fusion=RANK_FUSION):
+    """Hybrid ranking: BM25 prefilter, embedding rerank, reciprocal rank fusion.
+
+    Only the ``prefilter_n`` best BM25 candidates are embedded (0 = embed all);
+    the rest follow in BM25 order. Candidates are ordered by RRF of their BM25
+    and cosine ranks, or by cosine alone with ``fusion="cosine"``. Every
+    embedded paper is appended to the local vector index. With
+    ``search_corpus=True`` the ``corpus_k`` nearest previously indexed papers
+    join the candidates.
+    """
+    if not papers and not search_corpus:
+        return []
+    lexical = bm25_scores(query, [_doc_text(p) for p in papers])
+    if prefilter_n and len(papers) > prefilter_n:
+        candidates = [int(i) for i in top_k_indices(lexical, prefilter_n)]
+    else:
+        candidates = list(range(len(papers)))
+    # Papers with no abstract have nothing to embed; they keep their BM25 place after the pool.
+    pool = [papers[i] for i in candidates if _abstract(papers[i])]
+    chosen = {i for i in candidates if _abstract(papers[i])}
+    rest = [papers[i] for i in top_k_indices(lexical, None) if i not in chosen]
+    if not pool and not search_corpus:
+        return rest[:top_k] if top_k is not None else rest
+
+    embs = embed_texts([query] + [_abstract(p)[:2000] for p in pool])
+    q_emb = embs[0]
+    index = get_index()
+    cosine = np.zeros(0, dtype=np.float32)
+    if pool:
+        doc_embs = np.stack(embs[1:])
+        cosine = cosine_scores(q_emb, doc_embs)
+        index.add(pool, doc_embs)
+    if search_corpus:
+        fresh = {paper_key(p) for p in papers}
+        hits = [(s, p) for s, p in index.search(q_emb, k=corpus_k + len(papers)) if paper_key(p) not in fresh]
+        hits = hits[:corpus_k]
+        pool += [p for _, p in hits]
+        cosine = np.concatenate([cosine, np.array([s for s, _ in hits], dtype=np.float32)])
+    if not pool:
+        return rest[:top_k] if top_k is not None else rest
+    if fusion == "rrf":
+        # BM25 over the final pool so corpus hits get a lexical rank too.
+        scores = rrf_scores(bm25_scores(query, [_doc_text(p) for p in pool]), cosine)
+    else:
+        scores = cosine
+    ranked = [pool[i] for i in top_k_indices(np.asarray(scores), None)] + rest
+    return ranked[:top_k] if top_k is not None else ranked
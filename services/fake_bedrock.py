@@ -0,0 +1,100 @@
+# services/fake_bedrock.py
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+SECTIONS = ["Abstract", "Keywords", "Introduction", "Literature Review", "Methodology",
+            "Results and Discussion", "Conclusion", "References"]
+
+
+def _json_reply(prompt, keys, max_tokens):
+    # Prompts asking for JSON list their keys as "- name: ..." lines.
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    per_key = max(3, min(max_tokens, 300) // (2 * len(keys)))
+    text = " ".join(f"lorem{seed}" for _ in range(per_key))
+    return json.dumps({k: [text, text] if k in ("limitations", "innovations") else text for k in keys})
+
+
+def _draft(prompt, max_tokens):
+    keys = re.findall(r"^- (\w+):", prompt, re.M)
+    if keys and "JSON" in prompt:
+        return _json_reply(prompt, keys, max_tokens)
+    words = max(len(SECTIONS) * 4, min(max_tokens, 600))
+    per_section = words // len(SECTIONS)
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    body = " ".join(f"lorem{seed}" for _ in range(per_section - 1))
+    return "\n\n".join(f"{name}\n{body}." for name in SECTIONS)
+
+
+class FakeBedrockRuntime:
+    """Offline stand-in for a boto3 ``bedrock-runtime`` client.
+
+    Completions take ``latency`` seconds plus one ``1 / tokens_per_sec`` per
+    generated word. More than ``capacity`` concurrent calls raise a
+    ThrottlingException, like a real account at its quota.
+    """
+
+    def __init__(self, latency=0.3, tokens_per_sec=200.0, capacity=8, embedding_dim=1536):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.capacity = capacity
+        self.embedding_dim = embedding_dim
+        self.active = 0
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, operation):
+        with self._lock:
+            self.calls += 1
+            if self.active >= self.capacity:
+                self.throttled += 1
+                raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}},
+                                  operation)
+            self.active += 1
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def _embedding(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        vals = [(digest[i % len(digest)] - 128) / 128.0 for i in range(self.embedding_dim)]
+        return {"embedding": vals, "inputTextTokenCount": len(text.split())}
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None, **kwargs):
+        payload = json.loads(body)
+        self._enter("InvokeModel")
+        try:
+            if "inputText" in payload:
+                time.sleep(self.latency / 4)
+                out = self._embedding(payload["inputText"])
+            else:
+                text = _draft(payload.get("prompt", ""), payload.get("max_tokens", 256))
+                time.sleep(self.latency + len(text.split()) / self.tokens_per_sec)
+                out = {"outputs": [{"text": text, "stop_reason": "stop"}]}
+        finally:
+            self._exit()
+        return {"body": io.BytesIO(json.dumps(out).encode("utf-8")), "contentType": "application/json"}
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType=None, accept=None, **kwargs):
+        payload = json.loads(body)
+        self._enter("InvokeModelWithResponseStream")
+        text = _draft(payload.get("prompt", ""), payload.get("max_tokens", 256))
+
+        def events():
+            try:
+                time.sleep(self.latency)
+                for word in text.split(" "):
+                    time.sleep(1.0 / self.tokens_per_sec)
+                    chunk = {"outputs": [{"text": word + " ", "stop_reason": None}]}
+                    yield {"chunk": {"bytes": json.dumps(chunk).encode("utf-8")}}
+            finally:
+                self._exit()
+
+        return {"body": events(), "contentType": "application/json"}
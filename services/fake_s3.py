@@ -0,0 +1,62 @@
+# services/fake_s3.py
+import datetime
+import hashlib
+import io
+import threading
+
+
+class FakeS3:
+    """In-process stand-in for the subset of the boto3 S3 client this app uses."""
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> {"Body": bytes, "LastModified": datetime, "ETag": str, ...}
+        self.bytes_uploaded = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body=b"", ContentType="binary/octet-stream", **kwargs):
+        data = Body.read() if hasattr(Body, "read") else bytes(Body)
+        with self._lock:
+            self.objects[(Bucket, Key)] = {
+                "Body": data,
+                "ContentType": ContentType,
+                "LastModified": datetime.datetime.now(datetime.timezone.utc),
+                "ETag": '"%s"' % hashlib.md5(data).hexdigest(),
+            }
+            self.bytes_uploaded += len(data)
+        return {"ETag": self.objects[(Bucket, Key)]["ETag"]}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None, Callback=None):
+        extra = ExtraArgs or {}
+        self.put_object(Bucket, Key, Body=Fileobj, ContentType=extra.get("ContentType", "binary/octet-stream"))
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None, Callback=None):
+        with open(Filename, "rb") as fh:
+            self.upload_fileobj(fh, Bucket, Key, ExtraArgs=ExtraArgs)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        obj = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(obj["Body"]), "ContentLength": len(obj["Body"]),
+                "ContentType": obj["ContentType"], "ETag": obj["ETag"], "LastModified": obj["LastModified"]}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        obj = self.objects[(Bucket, Key)]
+        return {"ContentLength": len(obj["Body"]), "ContentType": obj["ContentType"],
+                "ETag": obj["ETag"], "LastModified": obj["LastModified"]}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, **kwargs):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        if ContinuationToken:
+            keys = [k for k in keys if k > ContinuationToken]
+        page, more = keys[:MaxKeys], len(keys) > MaxKeys
+        resp = {"KeyCount": len(page), "IsTruncated": more}
+        if page:
+            resp["Contents"] = [{"Key": k, "Size": len(self.objects[(Bucket, k)]["Body"]),
+                                 "LastModified": self.objects[(Bucket, k)]["LastModified"],
+                                 "ETag": self.objects[(Bucket, k)]["ETag"]} for k in page]
+        if more:
+            resp["NextContinuationToken"] = page[-1]
+        return resp
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600):
+        params = Params or {}
+        return f"http://fake-s3.local/{params.get('Bucket')}/{params.get('Key')}?X-Amz-Expires={ExpiresIn}"
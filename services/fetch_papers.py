@@ -1,27 +1,117 @@
 # services/fetch_papers.py
+import xml.etree.ElementTree as ET
+
 import requests
-import time
+from services import http_client
+from services.rate_limit import limiter
+from services.tracing import span
 
+ARXIV_API = "http://export.arxiv.org/api/query"
+ARXIV_MAX_PAGE = 100
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
 S2_BASE = "https://api.semanticscholar.org/graph/v1"
 
-def search_semantic_scholar(topic, limit=8):
-    """Return list of papers: {'title','abstract','url','year','authors'}"""
+
+class RateLimited(Exception):
+    pass
+
+
+def _polite(url, timeout):
+    if not limiter.acquire(url, timeout=timeout):
+        raise RateLimited(f"rate limit for {url} would exceed {timeout}s")
+
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    return " ".join((child.text or "").split()) if child is not None else ""
+
+
+def _arxiv_entry(entry):
+    link = _text(entry, ATOM + "id")
+    pdf = next((l.get("href") for l in entry.findall(ATOM + "link") if l.get("title") == "pdf"), None)
+    published = _text(entry, ATOM + "published")
+    return {
+        "source": "arXiv",
+        "title": _text(entry, ATOM + "title"),
+        "summary": _text(entry, ATOM + "summary"),
+        "url": link,
+        "pdf_url": pdf,
+        "year": int(published[:4]) if published[:4].isdigit() else None,
+        "authors": [_text(a, ATOM + "name") for a in entry.findall(ATOM + "author")][:5],
+        "doi": _text(entry, ARXIV_NS + "doi") or None,
+    }
+
+
+def parse_arxiv_feed(stream):
+    """Incrementally parse an arXiv Atom feed, yielding one paper per <entry>.
+
+    Each entry is dropped from the tree once converted, so memory stays flat
+    no matter how large the feed is.
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event == "end" and elem.tag == ATOM + "entry":
+            paper = _arxiv_entry(elem)
+            root.clear()
+            if paper["title"]:
+                yield paper
+
+
+def iter_arxiv(topic, page_size=50, max_results=None, timeout=20):
+    """Lazily page through arXiv results for a topic.
+
+    Pages of ``page_size`` are requested only as the caller consumes them and
+    the response body is parsed straight off the socket.
+    """
+    query = requests.utils.quote(topic)
+    start, seen = 0, 0
+    while max_results is None or seen < max_results:
+        size = page_size if max_results is None else min(page_size, max_results - seen)
+        url = f"{ARXIV_API}?search_query=all:{query}&start={start}&max_results={size}"
+        _polite(url, timeout)
+        with http_client.get(url, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            count = 0
+            for paper in parse_arxiv_feed(r.raw):
+                count += 1
+                yield paper
+        seen += count
+        start += size
+        if count < size:
+            return
+
+
+@span("arxiv.fetch")
+def fetch_arxiv(topic, max_results=3, timeout=20):
+    return list(iter_arxiv(topic, page_size=min(max_results, ARXIV_MAX_PAGE), max_results=max_results, timeout=timeout))
+
+
+@span("semantic_scholar.search")
+def search_semantic_scholar(topic, limit=8, timeout=15):
+    """Return list of papers: {'title','abstract','url','year','authors','doi','arxiv_id'}"""
     q = requests.utils.quote(topic)
-    fields = "title,abstract,url,year,authors"
+    fields = "title,abstract,url,year,authors,externalIds"
     url = f"{S2_BASE}/paper/search?query={q}&limit={limit}&fields={fields}"
-    r = requests.get(url, timeout=15)
+    _polite(url, timeout)
+    r = http_client.get(url, timeout=timeout)
     r.raise_for_status()
     data = r.json().get("data", [])
     papers = []
     for p in data:
         if p.get("abstract"):
+            ids = p.get("externalIds") or {}
             papers.append({
+                "source": "SemanticScholar",
                 "title": p.get("title"),
                 "abstract": p.get("abstract"),
                 "url": p.get("url"),
                 "year": p.get("year"),
-                "authors": [a.get("name") for a in p.get("authors", [])][:5]
+                "authors": [a.get("name") for a in p.get("authors", [])][:5],
+                "doi": ids.get("DOI"),
+                "arxiv_id": ids.get("ArXiv"),
             })
-    # small delay to keep polite to the API
-    time.sleep(0.5)
     return papers
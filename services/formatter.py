@@ -1,41 +1,23 @@
 # services/formatter.py
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from datetime import datetime
-import textwrap
+import io
+from services.tracing import BYTES, span
+from services.typeset import render
 
-def make_pdf(title, summary, limitations, innovations, filename="paper.pdf"):
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
-    margin = 50
-    y = height - margin
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(margin, y, title); y -= 28
-    c.setFont("Helvetica", 10)
-    c.drawString(margin, y, f"Generated: {datetime.utcnow().isoformat()} UTC"); y -= 20
-    # Summary
-    c.setFont("Helvetica-Bold", 12); c.drawString(margin, y, "Abstract:"); y -= 18
-    c.setFont("Helvetica", 10)
-    for line in textwrap.wrap(summary, 100):
-        c.drawString(margin, y, line); y -= 14
-    y -= 8
-    # Limitations
-    c.setFont("Helvetica-Bold", 12); c.drawString(margin, y, "Limitations:"); y -= 16
-    c.setFont("Helvetica", 10)
-    for lim in limitations:
-        for line in textwrap.wrap("- " + lim, 100):
-            c.drawString(margin, y, line); y -= 14
-        y -= 4
-    y -= 8
-    # Innovations
-    c.setFont("Helvetica-Bold", 12); c.drawString(margin, y, "Proposed Innovations:"); y -= 16
-    c.setFont("Helvetica", 10)
-    for inv in innovations:
-        title_line = inv.get("title", "")
-        summary_line = inv.get("summary","")
-        c.drawString(margin, y, f"• {title_line}"); y -= 14
-        for line in textwrap.wrap("   " + summary_line, 100):
-            c.drawString(margin, y, line); y -= 12
-        y -= 6
-    c.save()
-    return filename
+@span("pdf.render_analysis")
+def make_pdf(title, summary, limitations, innovations, filename=None):
+    """Render the analysis PDF. Returns a BytesIO unless a filename is given."""
+    sections = [
+        ("abstract", summary or ""),
+        ("limitations", "\n".join(f"- {lim}" for lim in limitations)),
+        ("proposed innovations", "\n".join(f"- {inv.get('title', '')}: {inv.get('summary', '')}"
+                                           for inv in innovations)),
+    ]
+    pdf = render([(name, body) for name, body in sections if body.strip()], title,
+                 f"Generated: {datetime.utcnow().isoformat()} UTC")
+    BYTES.inc(len(pdf), kind="pdf")
+    if filename:
+        with open(filename, "wb") as fh:
+            fh.write(pdf)
+        return filename
+    return io.BytesIO(pdf)
@@ -0,0 +1,148 @@
+# services/http_client.py
+import email.utils
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.tracing import registry
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 30))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# For non-idempotent requests only retry when the server says it did not act.
+UNPROCESSED_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+OUTBOUND_SECONDS = registry.histogram("outbound_http_seconds", "Outbound HTTP attempt latency by host.")
+OUTBOUND_RETRIES = registry.counter("outbound_http_retries_total", "Outbound HTTP retries by host.")
+
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HostStats:
+    __slots__ = ("requests", "retries", "errors", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.requests = self.retries = self.errors = 0
+        self.latency_total = self.latency_max = 0.0
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "latency_avg": self.latency_total / self.requests if self.requests else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+class HttpClient:
+    """Keep-alive session per host with retry, backoff and per-host counters."""
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def session(self, host):
+        with self._lock:
+            sess = self._sessions.get(host)
+            if sess is None:
+                sess = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                sess.mount("http://", adapter)
+                sess.mount("https://", adapter)
+                self._sessions[host] = sess
+                self._stats[host] = HostStats()
+            return sess
+
+    def _record(self, host, elapsed=None, retry=False, error=False):
+        if elapsed is not None:
+            OUTBOUND_SECONDS.observe(elapsed, host=host)
+        if retry:
+            OUTBOUND_RETRIES.inc(host=host)
+        with self._lock:
+            st = self._stats[host]
+            if elapsed is not None:
+                st.requests += 1
+                st.latency_total += elapsed
+                st.latency_max = max(st.latency_max, elapsed)
+            st.retries += retry
+            st.errors += error
+
+    def request(self, method, url, retries=None, **kwargs):
+        method = method.upper()
+        host = urlparse(url).netloc
+        sess = self.session(host)
+        retries = self.max_retries if retries is None else retries
+        retry_statuses = RETRY_STATUSES if method in IDEMPOTENT_METHODS else UNPROCESSED_STATUSES
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                resp = sess.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, time.perf_counter() - t0, error=True)
+                if attempt >= retries or method not in IDEMPOTENT_METHODS:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            else:
+                self._record(host, time.perf_counter() - t0, error=resp.status_code >= 500)
+                if resp.status_code not in retry_statuses or attempt >= retries:
+                    return resp
+                delay = _retry_after(resp)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                delay = min(delay, self.backoff_max)
+                resp.close()
+            self._record(host, retry=True)
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {host: st.to_dict() for host, st in self._stats.items()}
+
+
+client = HttpClient()
+get = client.get
+post = client.post
+request = client.request
+stats = client.stats
@@ -0,0 +1,129 @@
+# services/jobs.py
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+MAX_WORKERS = int(os.getenv("RESEARCH_WORKERS", 4))
+MAX_QUEUE = int(os.getenv("RESEARCH_QUEUE_DEPTH", 32))
+JOB_TTL = int(os.getenv("RESEARCH_JOB_TTL", 3600))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, payload):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def progress(self, stage):
+        """Mark the start of a pipeline stage; the previous one is closed."""
+        now = time.time()
+        if self.stages and self.stages[-1]["finished_at"] is None:
+            self.stages[-1]["finished_at"] = now
+        self.stage = stage
+        self.stages.append({"stage": stage, "started_at": now, "finished_at": None})
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """In-process job queue with a fixed pool of daemon worker threads.
+
+    ``submit`` raises QueueFull instead of blocking once ``max_queue`` jobs
+    are waiting, so callers can shed load immediately.
+    """
+
+    def __init__(self, handler, max_workers=MAX_WORKERS, max_queue=MAX_QUEUE, ttl=JOB_TTL):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._work, name=f"research-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, kind, payload):
+        job = Job(kind, payload)
+        with self._lock:
+            self._ensure_workers()
+            self._expire()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self._queue.qsize()} jobs already queued")
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = self.handler(job)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = getattr(e, "detail", None) or str(e) or traceback.format_exc(limit=1)
+            finally:
+                job.finished_at = time.time()
+                if job.stages and job.stages[-1]["finished_at"] is None:
+                    job.stages[-1]["finished_at"] = job.finished_at
+                with self._lock:
+                    self._running -= 1
+                self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "tracked_jobs": len(self._jobs),
+            }
@@ -0,0 +1,100 @@
+# services/json_repair.py
+import json
+import re
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PY_LITERALS = re.compile(r"([:\[,]\s*)(True|False|None)\b")
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _candidate(text):
+    """The JSON-looking part of a model reply: fenced block or first ``{``/``[`` onwards."""
+    m = _FENCE.search(text)
+    if m:
+        text = m.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):].strip() if starts else text.strip()
+
+
+def _close(text):
+    """Balance a truncated document: close an open string, drop a dangling key or comma, close brackets."""
+    stack, in_string, escaped = [], False, False
+    out = []
+    for ch in text:
+        out.append(ch)
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return "".join(out)  # complete document; ignore whatever follows
+    fixed = "".join(out)
+    if in_string:
+        fixed += '"'
+    if stack and stack[-1] == "}":
+        # Inside an object a trailing string with no value is a key: drop it.
+        fixed = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", fixed)
+    fixed = fixed.rstrip().rstrip(",").rstrip()
+    if fixed.endswith(":"):
+        fixed = fixed[:-1].rstrip()
+    return fixed + "".join(reversed(stack))
+
+
+def _unquote(body):
+    try:
+        return json.loads(f'"{body}"', strict=False)
+    except ValueError:
+        return body
+
+
+def _extract_fields(text, fields):
+    """Last resort: pull individual string or array-of-string fields out with regexes."""
+    found = {}
+    for name in fields:
+        m = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(name), text, re.S)
+        if m:
+            found[name] = _unquote(m.group(1))
+            continue
+        m = re.search(r'"%s"\s*:\s*\[(.*?)(?:\]|$)' % re.escape(name), text, re.S)
+        if m:
+            found[name] = [_unquote(s) for s in re.findall(r'"((?:[^"\\]|\\.)*)"', m.group(1))]
+    return found
+
+
+def loads_lenient(text, fields=()):
+    """Parse model output that should be JSON. Returns ``(value, status)``.
+
+    ``status`` is ``ok`` (valid as-is), ``repaired`` (fences, trailing commas,
+    smart quotes, Python literals or truncation fixed), ``partial`` (only the
+    named ``fields`` could be recovered) or ``failed`` (value is ``None``).
+    """
+    if not isinstance(text, str):
+        return (text, "ok") if text is not None else (None, "failed")
+    try:
+        return json.loads(text, strict=False), "ok"
+    except ValueError:
+        pass
+    text = text.translate(_SMART_QUOTES)
+    candidate = _candidate(text)
+    for attempt in (candidate, _close(candidate)):
+        attempt = _TRAILING_COMMA.sub(r"\1", attempt)
+        for variant in (attempt, _PY_LITERALS.sub(lambda m: m.group(1) + _JSON_LITERALS[m.group(2)], attempt)):
+            try:
+                return json.loads(variant, strict=False), "repaired"
+            except ValueError:
+                continue
+    found = _extract_fields(text, fields)
+    return (found, "partial") if found else (None, "failed")
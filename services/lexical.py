@@ -0,0 +1,50 @@
+# services/lexical.py
+import re
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+              "or", "that", "the", "this", "to", "we", "with"}
+
+
+def tokenize(text):
+    return [w for w in _WORD.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+def bm25_scores(query, docs, k1=1.5, b=0.75):
+    """Okapi BM25 of every document against the query.
+
+    Only query terms are counted, so the term matrix is ``len(docs) x
+    len(query terms)`` and scoring is a few array operations.
+    """
+    terms = {t: i for i, t in enumerate(dict.fromkeys(tokenize(query)))}
+    if not docs:
+        return np.zeros(0)
+    tokens = [tokenize(d) for d in docs]
+    lengths = np.fromiter((len(t) for t in tokens), dtype=np.float64, count=len(tokens))
+    if not terms:
+        return np.zeros(len(docs))
+    hits = [(row, terms[w]) for row, words in enumerate(tokens) for w in words if w in terms]
+    tf = np.zeros((len(docs), len(terms)), dtype=np.float64)
+    if hits:
+        rows, cols = np.array(hits).T
+        np.add.at(tf, (rows, cols), 1.0)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+    avg_len = lengths.mean() or 1.0
+    norm = k1 * (1 - b + b * lengths / avg_len)
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def ranks(scores):
+    """1-based rank of every item (best score = 1; ties keep input order)."""
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    out = np.empty(len(order), dtype=np.int64)
+    out[order] = np.arange(1, len(order) + 1)
+    return out
+
+
+def rrf_scores(*score_lists, k=60):
+    """Reciprocal rank fusion: ``sum(1 / (k + rank))`` over each ranking."""
+    return sum(1.0 / (k + ranks(s)) for s in score_lists)
@@ -0,0 +1,186 @@
+# services/manifest.py
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", os.path.join(".cache", "manifest.sqlite3"))
+RECONCILE_INTERVAL = int(os.getenv("MANIFEST_RECONCILE_INTERVAL", 900))
+
+
+def _encode_cursor(created_at, key):
+    return base64.urlsafe_b64encode(json.dumps([created_at, key]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(key)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def topic_from_key(key):
+    """Best-effort topic for objects uploaded before the manifest existed."""
+    name = os.path.basename(key).rsplit(".", 1)[0]
+    name = re.sub(r"_[0-9a-f]{8}$", "", name)
+    return name.replace("_", " ").strip()
+
+
+class Manifest:
+    """Local SQLite index of generated PDFs, kept in step with S3.
+
+    Uploads are recorded as they happen; ``reconcile`` walks the bucket to
+    pick up objects written elsewhere and drop ones that were deleted. A
+    generation counter bumped on every change backs ETags for listings.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                key TEXT PRIMARY KEY,
+                topic TEXT NOT NULL COLLATE NOCASE,
+                size INTEGER,
+                created_at REAL NOT NULL,
+                paper_ids TEXT NOT NULL DEFAULT '[]'
+            );
+            CREATE INDEX IF NOT EXISTS files_created ON files(created_at DESC, key DESC);
+            CREATE INDEX IF NOT EXISTS files_topic ON files(topic);
+            CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        try:
+            self._db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(topic, content='files', content_rowid='rowid');
+                CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+                    INSERT INTO files_fts(rowid, topic) VALUES (new.rowid, new.topic);
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+                    INSERT INTO files_fts(files_fts, rowid, topic) VALUES ('delete', old.rowid, old.topic);
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE ON files BEGIN
+                    INSERT INTO files_fts(files_fts, rowid, topic) VALUES ('delete', old.rowid, old.topic);
+                    INSERT INTO files_fts(rowid, topic) VALUES (new.rowid, new.topic);
+                END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite built without FTS5: fall back to LIKE
+        self._db.commit()
+
+    def _bump(self):
+        self._db.execute(
+            "INSERT INTO settings (name, value) VALUES ('generation', '1') "
+            "ON CONFLICT(name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def generation(self):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM settings WHERE name = 'generation'").fetchone()
+            return int(row[0]) if row else 0
+
+    def record(self, key, topic, size=None, created_at=None, paper_ids=()):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (key, topic, size, created_at, paper_ids) VALUES (?, ?, ?, ?, ?)",
+                (key, topic, size, created_at or time.time(), json.dumps(list(paper_ids))),
+            )
+            self._bump()
+            self._db.commit()
+
+    def page(self, limit=20, cursor=None, prefix=None, q=None):
+        """Newest-first listing. Returns ``(rows, next_cursor)``."""
+        where, args = [], []
+        if cursor:
+            created_at, key = _decode_cursor(cursor)
+            where.append("(f.created_at < ? OR (f.created_at = ? AND f.key < ?))")
+            args += [created_at, created_at, key]
+        if prefix:
+            where.append("f.topic LIKE ? ESCAPE '\\'")
+            args.append(re.sub(r"([%_\\])", r"\\\1", prefix) + "%")
+        join = ""
+        if q:
+            if self.fts:
+                terms = re.findall(r"\w+", q)
+                if terms:
+                    join = "JOIN files_fts ON files_fts.rowid = f.rowid"
+                    where.append("files_fts MATCH ?")
+                    args.append(" ".join(f'"{t}"*' for t in terms))
+            else:
+                where.append("f.topic LIKE ?")
+                args.append(f"%{q}%")
+        sql = (f"SELECT f.key, f.topic, f.size, f.created_at, f.paper_ids FROM files f {join} "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY f.created_at DESC, f.key DESC LIMIT ?")
+        with self._lock:
+            rows = self._db.execute(sql, args + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [{"key": r[0], "topic": r[1], "size": r[2], "created_at": r[3], "paper_ids": json.loads(r[4])}
+                 for r in rows]
+        next_cursor = _encode_cursor(rows[-1][3], rows[-1][0]) if more else None
+        return items, next_cursor
+
+    def etag(self, *params):
+        raw = json.dumps([self.generation(), params], default=str)
+        return '"%s"' % hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def reconcile(self, s3, bucket, prefix="generated/"):
+        """Sync with the bucket listing. Returns (added, removed)."""
+        started = time.time()
+        seen, found = set(), []
+        token = None
+        while True:
+            kwargs = {"Bucket": bucket, "Prefix": prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            resp = s3.list_objects_v2(**kwargs)
+            for obj in resp.get("Contents", []):
+                seen.add(obj["Key"])
+                found.append(obj)
+            if not resp.get("IsTruncated"):
+                break
+            token = resp["NextContinuationToken"]
+        with self._lock:
+            rows = self._db.execute("SELECT key, created_at FROM files WHERE substr(key, 1, ?) = ?",
+                                    (len(prefix), prefix)).fetchall()
+            known = {r[0] for r in rows}
+            added = [o for o in found if o["Key"] not in known]
+            # Rows recorded after the listing began may simply be missing from it.
+            removed = {key for key, created_at in rows if key not in seen and created_at < started}
+            self._db.executemany(
+                "INSERT INTO files (key, topic, size, created_at) VALUES (?, ?, ?, ?)",
+                [(o["Key"], topic_from_key(o["Key"]), o.get("Size"), o["LastModified"].timestamp()) for o in added],
+            )
+            self._db.executemany("DELETE FROM files WHERE key = ?", [(k,) for k in removed])
+            if added or removed:
+                self._bump()
+            self._db.commit()
+        return len(added), len(removed)
+
+    def start_reconciler(self, s3, bucket, prefix="generated/", interval=RECONCILE_INTERVAL):
+        def loop():
+            while True:
+                try:
+                    added, removed = self.reconcile(s3, bucket, prefix)
+                    if added or removed:
+                        log.info("manifest reconcile: +%d -%d", added, removed)
+                except Exception:
+                    log.exception("manifest reconcile failed")
+                time.sleep(interval)
+
+        t = threading.Thread(target=loop, name="manifest-reconciler", daemon=True)
+        t.start()
+        return t
@@ -0,0 +1,209 @@
+# services/paper_store.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from services.result_cache import normalize_topic
+
+PAPER_STORE_PATH = os.getenv("PAPER_STORE_PATH", os.path.join(".cache", "papers.sqlite3"))
+FRESH_FOR = int(os.getenv("PAPER_STORE_TTL", 12 * 3600))
+SERVE_STALE_FOR = int(os.getenv("PAPER_STORE_MAX_STALE", 7 * 24 * 3600))
+FAILURE_BACKOFF = int(os.getenv("PAPER_STORE_FAILURE_BACKOFF", 120))
+
+_FIELDS = ("id", "source", "title", "abstract", "url", "year", "authors", "doi", "arxiv_id")
+
+
+def _row_to_paper(row):
+    paper = dict(zip(_FIELDS, row))
+    paper["authors"] = json.loads(paper["authors"] or "[]")
+    paper["abstract"] = paper["abstract"] or ""
+    paper["url"] = paper["url"] or ""
+    return paper
+
+
+class PaperStore:
+    """Local SQLite store of every paper the remote sources have returned.
+
+    ``queries`` remembers when each (source, normalized query) was last
+    fetched and how many results were asked for; ``query_papers`` keeps the
+    ranked result list so a repeated query is answered without a remote call.
+    Papers are upserted, so refreshes only add or fill in records. An FTS5
+    index over titles and abstracts answers queries never seen before when
+    the sources are unreachable.
+    """
+
+    def __init__(self, path=PAPER_STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                id TEXT PRIMARY KEY, source TEXT, title TEXT NOT NULL, abstract TEXT, url TEXT,
+                year INTEGER, authors TEXT, doi TEXT, arxiv_id TEXT, updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS queries (
+                source TEXT NOT NULL, query TEXT NOT NULL, requested INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL, failed_at REAL, error TEXT, PRIMARY KEY (source, query)
+            );
+            CREATE TABLE IF NOT EXISTS query_papers (
+                source TEXT NOT NULL, query TEXT NOT NULL, rank INTEGER NOT NULL, paper_id TEXT NOT NULL,
+                PRIMARY KEY (source, query, rank)
+            );
+            CREATE TABLE IF NOT EXISTS digests (
+                paper_id TEXT NOT NULL, model TEXT NOT NULL, version INTEGER NOT NULL, digest TEXT NOT NULL,
+                created_at REAL NOT NULL, PRIMARY KEY (paper_id, model, version)
+            );
+        """)
+        try:
+            self._db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts
+                    USING fts5(title, abstract, content='papers', content_rowid='rowid');
+                CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                    INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                        VALUES ('delete', old.rowid, old.title, old.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                    INSERT INTO papers_fts(papers_fts, rowid, title, abstract)
+                        VALUES ('delete', old.rowid, old.title, old.abstract);
+                    INSERT INTO papers_fts(rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+                END;
+            """)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite built without FTS5: fall back to LIKE on titles
+        self._db.commit()
+
+    def upsert(self, papers):
+        """Insert new papers; for known ids, fill fields that were missing."""
+        now = time.time()
+        rows = [(p["id"], p.get("source"), p["title"], p.get("abstract") or None, p.get("url") or None,
+                 p.get("year"), json.dumps(p.get("authors") or []), p.get("doi"), p.get("arxiv_id"), now)
+                for p in papers]
+        with self._lock:
+            self._db.executemany("""
+                INSERT INTO papers (id, source, title, abstract, url, year, authors, doi, arxiv_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    abstract = COALESCE(papers.abstract, excluded.abstract),
+                    url = COALESCE(papers.url, excluded.url),
+                    year = COALESCE(papers.year, excluded.year),
+                    authors = CASE WHEN papers.authors = '[]' THEN excluded.authors ELSE papers.authors END,
+                    doi = COALESCE(papers.doi, excluded.doi),
+                    arxiv_id = COALESCE(papers.arxiv_id, excluded.arxiv_id),
+                    updated_at = excluded.updated_at
+            """, rows)
+            self._db.commit()
+
+    def record_fetch(self, source, topic, requested, papers):
+        """Store a successful remote result for ``(source, topic)``."""
+        query = normalize_topic(topic)
+        self.upsert(papers)
+        with self._lock:
+            self._db.execute("DELETE FROM query_papers WHERE source = ? AND query = ?", (source, query))
+            self._db.executemany("INSERT INTO query_papers (source, query, rank, paper_id) VALUES (?, ?, ?, ?)",
+                                 [(source, query, i, p["id"]) for i, p in enumerate(papers)])
+            self._db.execute(
+                "INSERT INTO queries (source, query, requested, fetched_at, failed_at, error) "
+                "VALUES (?, ?, ?, ?, NULL, NULL) ON CONFLICT(source, query) DO UPDATE SET "
+                "requested = excluded.requested, fetched_at = excluded.fetched_at, failed_at = NULL, error = NULL",
+                (source, query, requested, time.time()))
+            self._db.commit()
+
+    def record_failure(self, source, topic, error):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO queries (source, query, failed_at, error) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(source, query) DO UPDATE SET failed_at = excluded.failed_at, error = excluded.error",
+                (source, normalize_topic(topic), time.time(), str(error)[:500]))
+            self._db.commit()
+
+    def status(self, source, topic, limit):
+        """Classify a query as ``fresh``, ``stale``, ``backoff`` or ``missing``, with its age in seconds."""
+        with self._lock:
+            row = self._db.execute("SELECT requested, fetched_at, failed_at FROM queries WHERE source = ? AND query = ?",
+                                   (source, normalize_topic(topic))).fetchone()
+        now = time.time()
+        if row is None:
+            return "missing", None
+        requested, fetched_at, failed_at = row
+        age = now - fetched_at if fetched_at else None
+        if age is not None and requested >= limit and age < FRESH_FOR:
+            return "fresh", age
+        if failed_at and now - failed_at < FAILURE_BACKOFF:
+            return "backoff", age
+        if age is not None and requested >= limit and age < SERVE_STALE_FOR:
+            return "stale", age
+        return "missing", age
+
+    def cached(self, source, topic, limit):
+        """The stored result list for a query, in the order the source returned it."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join('p.' + f for f in _FIELDS)} FROM query_papers q "
+                "JOIN papers p ON p.id = q.paper_id WHERE q.source = ? AND q.query = ? ORDER BY q.rank LIMIT ?",
+                (source, normalize_topic(topic), limit)).fetchall()
+        return [_row_to_paper(r) for r in rows]
+
+    def search(self, topic, limit):
+        """Best stored matches for a topic, for queries the sources never answered."""
+        terms = re.findall(r"\w+", normalize_topic(topic))
+        if not terms:
+            return []
+        cols = ", ".join("p." + f for f in _FIELDS)
+        with self._lock:
+            if self.fts:
+                rows = self._db.execute(
+                    f"SELECT {cols} FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+                    "WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts) LIMIT ?",
+                    (" OR ".join(f'"{t}"*' for t in terms), limit)).fetchall()
+            else:
+                rows = self._db.execute(
+                    f"SELECT {cols} FROM papers p WHERE " + " OR ".join("p.title LIKE ?" for _ in terms)
+                    + " LIMIT ?", [f"%{t}%" for t in terms] + [limit]).fetchall()
+        return [_row_to_paper(r) for r in rows]
+
+    def get_digests(self, paper_ids, model, version):
+        """Cached per-paper analysis digests, ``{paper_id: digest}``; independent of the topic."""
+        found = {}
+        ids = list(dict.fromkeys(paper_ids))
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT paper_id, digest FROM digests WHERE model = ? AND version = ? "
+                    f"AND paper_id IN ({', '.join('?' * len(chunk))})", [model, version] + chunk).fetchall()
+                found.update((pid, json.loads(d)) for pid, d in rows)
+        return found
+
+    def put_digest(self, paper_id, model, version, digest):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO digests (paper_id, model, version, digest, created_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (paper_id, model, version, json.dumps(digest), time.time()))
+            self._db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            papers = self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            queries = self._db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+            digests = self._db.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+        return {"papers": papers, "queries": queries, "digests": digests, "fts": self.fts}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PaperStore()
+        return _store
@@ -0,0 +1,163 @@
+# services/pipeline.py
+import queue
+import threading
+import time
+
+_POLL = 0.1  # seconds between cancellation checks while blocked on a queue
+
+
+class Stage:
+    """One pipeline step: ``fn(item) -> item`` run by ``workers`` threads off a bounded queue."""
+
+    def __init__(self, name, fn, workers=2, queue_size=8):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+
+class _StageStats:
+    def __init__(self, workers):
+        self.workers = workers
+        self.items = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def to_dict(self, wall):
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy, 3),
+            "avg_service_seconds": round(self.busy / self.items, 3) if self.items else 0.0,
+            "avg_queue_wait_seconds": round(self.waited / self.items, 3) if self.items else 0.0,
+            "utilization": round(self.busy / (self.workers * wall), 3) if wall else 0.0,
+        }
+
+
+class Pipeline:
+    """Staged executor: every stage has its own worker pool and bounded input queue.
+
+    Items move to the next stage as soon as they leave the previous one, so
+    different items occupy different stages at once and throughput tends to
+    the capacity of the slowest stage. ``is_done(item)`` lets an item skip
+    the remaining stages (e.g. a cache hit after retrieval); ``on_drop(item)``
+    is called once for every item a cancelled run will not yield, including
+    items a stage is still working on, so callers can release what they hold.
+    """
+
+    def __init__(self, stages, is_done=lambda item: False, on_drop=None):
+        self.stages = stages
+        self.is_done = is_done
+        self.on_drop = on_drop
+        self.stats = {s.name: _StageStats(s.workers) for s in stages}
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._live = {}  # index -> item not yet yielded
+        self._live_lock = threading.Lock()
+
+    def cancel(self):
+        """Stop a run from another thread, e.g. when the client of a streamed response disconnects."""
+        self._cancel.set()
+        with self._live_lock:
+            dropped, self._live = list(self._live.values()), {}
+        if self.on_drop:
+            for item in dropped:
+                self.on_drop(item)
+
+    def run(self, items):
+        """Yield ``(index, item, error)`` for each input as soon as it leaves the pipeline.
+
+        Closing the generator early or calling :meth:`cancel` stops the run:
+        queued items are dropped (every unyielded item goes to ``on_drop``),
+        no new stage calls start and every thread exits; calls already in
+        progress finish first.
+        """
+        items = list(items)
+        with self._live_lock:
+            self._live = dict(enumerate(items))
+        queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        output = queue.Queue()
+        cancel = self._cancel
+        self.started = time.perf_counter()
+
+        def put(q, entry):
+            while not cancel.is_set():
+                try:
+                    q.put(entry, timeout=_POLL)
+                    return
+                except queue.Full:
+                    continue
+
+        def forward(pos, index, item):
+            if pos >= len(self.stages) or self.is_done(item):
+                output.put((index, item, None))
+            else:
+                put(queues[pos], (index, item, time.perf_counter()))
+
+        def feed():
+            for i, item in enumerate(items):
+                if cancel.is_set():
+                    return
+                forward(0, i, item)
+
+        def work(pos):
+            stage, stats, inbox = self.stages[pos], self.stats[self.stages[pos].name], queues[pos]
+            while not cancel.is_set():
+                try:
+                    index, item, queued_at = inbox.get(timeout=_POLL)
+                except queue.Empty:
+                    continue
+                if cancel.is_set():
+                    return
+                t0 = time.perf_counter()
+                try:
+                    item = stage.fn(item)
+                    error = None
+                except Exception as e:
+                    error = e
+                t1 = time.perf_counter()
+                with stats.lock:
+                    stats.items += 1
+                    stats.failed += error is not None
+                    stats.busy += t1 - t0
+                    stats.waited += t0 - queued_at
+                if error is not None:
+                    output.put((index, item, error))
+                else:
+                    forward(pos + 1, index, item)
+
+        threads = [threading.Thread(target=work, args=(pos,), name=f"pipeline-{stage.name}-{i}", daemon=True)
+                   for pos, stage in enumerate(self.stages) for i in range(stage.workers)]
+        threads.append(threading.Thread(target=feed, name="pipeline-feeder", daemon=True))
+        for t in threads:
+            t.start()
+        try:
+            for _ in range(len(items)):
+                while True:
+                    try:
+                        entry = output.get(timeout=_POLL)
+                        break
+                    except queue.Empty:
+                        if cancel.is_set():
+                            return
+                with self._live_lock:
+                    self._live.pop(entry[0], None)
+                yield entry
+        finally:
+            self.finished = time.perf_counter()
+            self.cancel()
+            for q in queues:  # drop queued work so nothing holds on to it
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+
+    def report(self):
+        wall = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        return {"wall_seconds": round(wall, 3),
+                "stages": {name: st.to_dict(wall) for name, st in self.stats.items()}}
@@ -0,0 +1,118 @@
+# services/prompt_builder.py
+import os
+import re
+import threading
+
+import numpy as np
+
+from services.tracing import span
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 1200))
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return max(1, len(text or "") // 4)
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE.split(" ".join((text or "").split())) if s.strip()]
+
+
+def score_sentences(query, sentences):
+    """TF-IDF cosine of every sentence against the query, computed as one matrix product."""
+    docs = [_WORD.findall(s.lower()) for s in sentences]
+    vocab = {}
+    for words in docs + [_WORD.findall(query.lower())]:
+        for w in words:
+            vocab.setdefault(w, len(vocab))
+    if not vocab or not sentences:
+        return np.zeros(len(sentences))
+    rows = np.repeat(np.arange(len(docs)), [len(d) for d in docs])
+    cols = np.fromiter((vocab[w] for d in docs for w in d), dtype=np.int64, count=len(rows))
+    tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+    np.add.at(tf, (rows, cols), 1.0)
+    idf = np.log((1 + len(docs)) / (1 + (tf > 0).sum(axis=0))) + 1.0
+    mat = tf * idf
+    q = np.zeros(len(vocab), dtype=np.float32)
+    for w in _WORD.findall(query.lower()):
+        q[vocab[w]] += 1.0
+    q *= idf
+    norms = np.linalg.norm(mat, axis=1) * (np.linalg.norm(q) or 1.0)
+    norms[norms == 0] = 1.0
+    return (mat @ q) / norms
+
+
+class PromptBuilder:
+    """Fits paper abstracts into an input-token budget by extractive compression.
+
+    The budget left after the fixed prompt text is shared across papers;
+    abstracts that fit whole pass through unchanged and hand their unused
+    share to the rest. The others keep their most query-relevant sentences,
+    in their original order.
+    """
+
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self.stats = {"prompts": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _compress(self, query, text, allowance):
+        sentences = split_sentences(text)
+        if not sentences:
+            return ""
+        scores = score_sentences(query, sentences)
+        # Lead sentences usually state the contribution; give them a small prior.
+        scores = scores + 0.05 / (1 + np.arange(len(sentences)))
+        costs = np.array([estimate_tokens(s) + 1 for s in sentences])
+        keep, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if used + costs[i] <= allowance:
+                keep.append(i)
+                used += costs[i]
+        if not keep:
+            best = int(np.argmax(scores))
+            return sentences[best][: max(0, allowance) * 4]
+        return " ".join(sentences[i] for i in sorted(keep))
+
+    @span("prompt.build")
+    def fit(self, query, papers, fixed_text="", budget=None):
+        """Return ``(papers, report)`` with abstracts compressed to fit the budget."""
+        budget = self.budget if budget is None else budget
+        abstracts = [p.get("abstract") or p.get("summary") or "" for p in papers]
+        overhead = estimate_tokens(fixed_text) + sum(
+            estimate_tokens(f"Title: {p.get('title', '')}\nURL: {p.get('url', '')}\nAbstract: ") for p in papers)
+        before = overhead + sum(estimate_tokens(a) for a in abstracts)
+        remaining = max(0, budget - overhead)
+
+        # Water-filling: short abstracts keep their full text, the rest share what is left.
+        need = sorted(range(len(papers)), key=lambda i: estimate_tokens(abstracts[i]))
+        allowance = {}
+        for n, i in enumerate(need):
+            share = remaining // max(1, len(need) - n)
+            allowance[i] = min(share, estimate_tokens(abstracts[i]))
+            remaining -= allowance[i]
+
+        fitted = []
+        for i, (p, text) in enumerate(zip(papers, abstracts)):
+            if estimate_tokens(text) > allowance[i]:
+                text = self._compress(query, text, allowance[i])
+            fitted.append(dict(p, abstract=text))
+        after = overhead + sum(estimate_tokens(p["abstract"]) for p in fitted)
+        report = {"budget": budget, "tokens_before": before, "tokens_after": after,
+                  "tokens_saved": max(0, before - after), "papers": len(papers)}
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["tokens_before"] += before
+            self.stats["tokens_after"] += after
+        return fitted, report
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, tokens_saved=self.stats["tokens_before"] - self.stats["tokens_after"])
+
+
+builder = PromptBuilder()
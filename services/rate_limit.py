@@ -0,0 +1,67 @@
+# services/rate_limit.py
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+# requests per second, burst size
+DEFAULT_LIMITS = {
+    "export.arxiv.org": (float(os.getenv("ARXIV_RATE_PER_SEC", 1.0)), int(os.getenv("ARXIV_RATE_BURST", 3))),
+    "api.semanticscholar.org": (float(os.getenv("S2_RATE_PER_SEC", 2.0)), int(os.getenv("S2_RATE_BURST", 2))),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self, now, n):
+        """Take n tokens (possibly going negative) and return how long to wait for them."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, timeout=None, n=1):
+        with self.lock:
+            now = time.monotonic()
+            wait = self._reserve(now, min(n, self.capacity))
+            if timeout is not None and wait > timeout:
+                self.tokens += min(n, self.capacity)  # give the reservation back
+                return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class HostRateLimiter:
+    """Per-host token buckets shared by every outbound caller in the process."""
+
+    def __init__(self, limits=None, default=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                limit = self.limits.get(host, self.default)
+                if limit is None:
+                    return None
+                bucket = self._buckets[host] = TokenBucket(*limit)
+            return bucket
+
+    def acquire(self, url_or_host, timeout=None):
+        """Block until the host allows another request. False if that would exceed ``timeout``."""
+        host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+        bucket = self._bucket(host)
+        return True if bucket is None else bucket.acquire(timeout)
+
+
+limiter = HostRateLimiter()
@@ -0,0 +1,145 @@
+# services/result_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TTL = int(os.getenv("RESULT_CACHE_TTL", 6 * 3600))
+MAX_ITEMS = int(os.getenv("RESULT_CACHE_MAX_ITEMS", 512))
+
+_STOPWORDS = {"a", "an", "and", "for", "in", "of", "on", "the", "to", "with", "using", "via"}
+
+
+def normalize_topic(topic):
+    """Order- and punctuation-insensitive form so near-identical topics share a key."""
+    words = re.findall(r"[a-z0-9]+", (topic or "").lower())
+    return " ".join(sorted({w for w in words if w not in _STOPWORDS}))
+
+
+def result_key(topic, paper_ids, params):
+    payload = json.dumps([normalize_topic(topic), sorted(paper_ids), params], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """TTL + LRU cache with single-flight coalescing of identical computations.
+
+    Entries remember how long they took to build so hits can report the time
+    they saved.
+    """
+
+    def __init__(self, ttl=TTL, max_items=MAX_ITEMS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items = OrderedDict()  # key -> (expires_at, cost_seconds, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "time_saved": 0.0}
+
+    def _lookup(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] < time.time():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._lookup(key)
+            if item is None:
+                return None
+            self.stats["hits"] += 1
+            self.stats["time_saved"] += item[1]
+            return item[2]
+
+    def put(self, key, value, cost=0.0):
+        with self._lock:
+            self._items[key] = (time.time() + self.ttl, cost, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def claim(self, key):
+        """Non-blocking single-flight lookup for callers that produce the value incrementally.
+
+        Returns ``("hit", value)``, ``("lead", None)`` (the caller must
+        :meth:`finish` the key) or ``("follow", flight)`` (pass it to :meth:`wait`).
+        """
+        with self._lock:
+            item = self._lookup(key)
+            if item is not None:
+                self.stats["hits"] += 1
+                self.stats["time_saved"] += item[1]
+                return "hit", item[2]
+            flight = self._flights.get(key)
+            if flight is None:
+                self._flights[key] = _Flight()
+                self.stats["misses"] += 1
+                return "lead", None
+            self.stats["coalesced"] += 1
+            return "follow", flight
+
+    def finish(self, key, value=None, cost=0.0, error=None):
+        """Complete a flight claimed with ``"lead"``: cache ``value`` or hand ``error`` to the followers."""
+        if error is None:
+            self.put(key, value, cost)
+        with self._lock:
+            flight = self._flights.pop(key)
+        flight.value, flight.error = value, error
+        flight.done.set()
+
+    def wait(self, key, flight):
+        """The leader's value; re-raises the leader's error."""
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        with self._lock:
+            item = self._items.get(key)
+            self.stats["time_saved"] += item[1] if item else 0.0
+        return flight.value
+
+    def get_or_compute(self, key, compute, on_wait=None):
+        """Return ``(value, how)`` where how is "hit", "coalesced" or "computed"."""
+        how, value = self.claim(key)
+        while how == "follow":
+            if on_wait:
+                on_wait()
+            try:
+                return self.wait(key, value), "coalesced"
+            except Exception:
+                how, value = self.claim(key)  # the leader failed or was cancelled: take over
+        if how == "hit":
+            return value, "hit"
+
+        t0 = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, value, time.perf_counter() - t0)
+        return value, "computed"
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "size": len(self._items),
+                "in_flight": len(self._flights),
+                "hit_rate": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0.0,
+            }
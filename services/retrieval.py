@@ -0,0 +1,158 @@
+# services/retrieval.py
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from services.fetch_papers import fetch_arxiv, search_semantic_scholar
+from services.paper_store import get_store
+from services.result_cache import normalize_topic
+from services.tracing import span
+
+log = logging.getLogger(__name__)
+
+ARXIV_DEADLINE = float(os.getenv("ARXIV_DEADLINE", 12))
+S2_DEADLINE = float(os.getenv("S2_DEADLINE", 8))
+PER_SOURCE_LIMIT = int(os.getenv("RETRIEVAL_PER_SOURCE", 3))
+
+# name -> (fetch function, deadline in seconds)
+SOURCES = {
+    "arXiv": (lambda topic, limit, timeout: fetch_arxiv(topic, max_results=limit, timeout=timeout), ARXIV_DEADLINE),
+    "SemanticScholar": (lambda topic, limit, timeout: search_semantic_scholar(topic, limit=limit, timeout=timeout), S2_DEADLINE),
+}
+
+# Shared so a source that overruns its deadline finishes in the background
+# instead of blocking the request that gave up on it.
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RETRIEVAL_THREADS", 8)), thread_name_prefix="retrieval")
+
+_ARXIV_ID = re.compile(r"arxiv\.org/abs/(.+?)(?:v\d+)?$")
+
+
+def normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).strip()
+
+
+def normalize_paper(p, source=None):
+    """Map a source-specific record onto the common paper schema."""
+    url = p.get("url") or ""
+    arxiv_id = p.get("arxiv_id")
+    if not arxiv_id:
+        m = _ARXIV_ID.search(url)
+        arxiv_id = m.group(1) if m else None
+    doi = (p.get("doi") or "").lower() or None
+    title = " ".join((p.get("title") or "").split())
+    paper = {
+        "source": p.get("source") or source,
+        "title": title,
+        "abstract": " ".join((p.get("abstract") or p.get("summary") or "").split()),
+        "url": url,
+        "year": p.get("year"),
+        "authors": p.get("authors") or [],
+        "doi": doi,
+        "arxiv_id": arxiv_id,
+    }
+    paper["id"] = (f"arxiv:{arxiv_id}" if arxiv_id else f"doi:{doi}" if doi
+                   else f"title:{normalize_title(title)}")
+    return paper
+
+
+def _dedup_keys(p):
+    keys = [f"title:{normalize_title(p['title'])}"]
+    if p["arxiv_id"]:
+        keys.append(f"arxiv:{p['arxiv_id']}")
+    if p["doi"]:
+        keys.append(f"doi:{p['doi']}")
+    return keys
+
+
+def merge_papers(batches):
+    """Deduplicate by arXiv id, DOI or normalized title; earlier batches win, later ones fill gaps."""
+    merged, by_key = [], {}
+    for batch in batches:
+        for p in batch:
+            keys = _dedup_keys(p)
+            existing = next((by_key[k] for k in keys if k in by_key), None)
+            if existing is None:
+                existing = dict(p)
+                merged.append(existing)
+            else:
+                for field, value in p.items():
+                    if value and not existing.get(field):
+                        existing[field] = value
+            for k in _dedup_keys(existing):
+                by_key[k] = existing
+    return merged
+
+
+_refreshes = {}  # (source, normalized topic) -> in-flight future, shared by concurrent requests
+_refreshes_lock = threading.Lock()
+
+
+def _fetch_and_store(name, topic, limit):
+    fn, deadline = SOURCES[name]
+    store = get_store()
+    try:
+        papers = [normalize_paper(p, name) for p in fn(topic, limit, deadline)]
+    except Exception as e:
+        store.record_failure(name, topic, str(e) or type(e).__name__)
+        raise
+    # Stored even when the request that asked has already given up on the deadline.
+    store.record_fetch(name, topic, limit, papers)
+    return papers
+
+
+def _refresh(name, topic, limit):
+    key = (name, normalize_topic(topic), limit)
+    with _refreshes_lock:
+        future = _refreshes.get(key)
+        if future is None:
+            future = _refreshes[key] = _executor.submit(contextvars.copy_context().run,
+                                                        _fetch_and_store, name, topic, limit)
+            future.add_done_callback(lambda f: _refreshes.pop(key, None))
+    return future
+
+
+@span("retrieval")
+def retrieve_papers(topic, limit=PER_SOURCE_LIMIT, sources=None):
+    """Answer from the local paper store first; query remote sources only for stale or unseen topics.
+
+    Fresh queries are served from the store. Stale ones are served from the
+    store too while a background refresh updates them. Unseen ones query the
+    source under its deadline, and if it fails or times out the stored
+    result (or a full-text match over stored papers) is used instead.
+    Returns ``(papers, report)``; ``report[source]["store"]`` says which path was taken.
+    """
+    names = list(sources or SOURCES)
+    store = get_store()
+    start = time.monotonic()
+    futures, batches, report = {}, {}, {}
+    for name in names:
+        status, age = store.status(name, topic, limit)
+        if status == "missing":
+            futures[name] = _refresh(name, topic, limit)
+            continue
+        batches[name] = store.cached(name, topic, limit)
+        if status == "stale":
+            _refresh(name, topic, limit)
+        elif status == "backoff" and not batches[name]:
+            # The source failed moments ago and never answered this query: don't hammer it.
+            batches[name] = store.search(topic, limit)
+        report[name] = {"count": len(batches[name]), "elapsed": 0.0, "store": status,
+                        "age": round(age, 1) if age is not None else None}
+
+    for name, future in futures.items():
+        deadline = SOURCES[name][1]
+        try:
+            batches[name] = future.result(timeout=max(0.0, start + deadline - time.monotonic()))
+            report[name] = {"count": len(batches[name]), "elapsed": round(time.monotonic() - start, 3),
+                            "store": "refreshed"}
+        except Exception as e:
+            error = "deadline exceeded" if isinstance(e, FutureTimeout) else str(e) or type(e).__name__
+            log.warning("retrieval source %s failed: %s", name, error)
+            batches[name] = store.cached(name, topic, limit) or store.search(topic, limit)
+            report[name] = {"count": len(batches[name]), "elapsed": round(time.monotonic() - start, 3),
+                            "error": error, "store": "fallback"}
+    return merge_papers(batches[name] for name in names if name in batches), report
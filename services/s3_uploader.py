@@ -1,11 +1,24 @@
 # services/s3_uploader.py
-import boto3, os
-S3 = boto3.client("s3", region_name=os.getenv("AWS_REGION","us-east-1"))
+import os
+from services.aws_clients import get_client, transfer_config
+from services.tracing import BYTES, span
 BUCKET = os.getenv("S3_BUCKET")
 
+@span("s3.upload")
 def upload_file(local_path, key=None):
     if key is None:
         key = os.path.basename(local_path)
-    S3.upload_file(local_path, BUCKET, key)
+    get_client("s3").upload_file(local_path, BUCKET, key, Config=transfer_config())
+    url = f"https://{BUCKET}.s3.amazonaws.com/{key}"
+    return url
+
+@span("s3.upload")
+def upload_fileobj(fileobj, key, content_type="application/pdf"):
+    """Stream an in-memory (or any binary) file object to S3 without touching disk."""
+    fileobj.seek(0, os.SEEK_END)
+    BYTES.inc(fileobj.tell(), kind="s3_upload")
+    fileobj.seek(0)
+    get_client("s3").upload_fileobj(fileobj, BUCKET, key, Config=transfer_config(),
+                                    ExtraArgs={"ContentType": content_type})
     url = f"https://{BUCKET}.s3.amazonaws.com/{key}"
     return url
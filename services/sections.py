@@ -0,0 +1,38 @@
+# services/sections.py
+import re
+
+# Sections build_ieee_prompt asks the model for, in order.
+SECTION_HEADERS = ("abstract", "keywords", "introduction", "literature review", "methodology",
+                   "results and discussion", "conclusion", "references")
+
+_NUMBERING = re.compile(r"^(?:[ivxlc]+|\d+)[.)]\s+", re.I)
+_INLINE = re.compile(r"^(%s)\s*[:—-]\s*(.+)$" % "|".join(SECTION_HEADERS), re.I)
+
+
+def section_of(line):
+    """Canonical section name if the line is a bare IEEE section header."""
+    name = line.strip().strip("#*_ ").rstrip(":.").strip().lower()
+    name = _NUMBERING.sub("", name).strip("*_ ")
+    return name if name in SECTION_HEADERS else None
+
+
+def split_sections(text):
+    """Split generated paper text into ``[(section, body), ...]``.
+
+    Text before the first header is returned under "preamble"; headers
+    written inline ("Keywords: a, b, c") start a section with that content.
+    """
+    sections, name, lines = [], "preamble", []
+    for line in (text or "").splitlines():
+        header = section_of(line)
+        inline = None if header else _INLINE.match(_NUMBERING.sub("", line.strip().strip("#*_ ")))
+        if header or inline:
+            if any(l.strip() for l in lines):
+                sections.append((name, "\n".join(lines).strip()))
+            name = header or inline.group(1).lower()
+            lines = [inline.group(2)] if inline else []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((name, "\n".join(lines).strip()))
+    return sections
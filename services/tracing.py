@@ -0,0 +1,222 @@
+# services/tracing.py
+import bisect
+import contextvars
+import functools
+import threading
+import time
+import uuid
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _fmt_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _fmt_labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackGauge:
+    """Gauge whose values are read from ``fn() -> {labels_tuple_or_dict: value}`` at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, fn):
+        self.name, self.help, self.fn = name, help, fn
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        return [(self.name + _fmt_labels(_labels_key(dict(k)) if k else ()), v) for k, v in values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts..., sum, count]; +Inf is the count
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _labels_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                out.append((self.name + "_bucket" + _fmt_labels(key, [("le", repr(float(bound)))]), cumulative))
+            out.append((self.name + "_bucket" + _fmt_labels(key, [("le", "+Inf")]), series[-1]))
+            out.append((self.name + "_sum" + _fmt_labels(key), series[-2]))
+            out.append((self.name + "_count" + _fmt_labels(key), series[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, *args)
+            return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def callback_gauge(self, name, help, fn):
+        return self._get(CallbackGauge, name, help, fn)
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(f"{name} {value}" for name, value in m.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram("research_stage_seconds", "Duration of instrumented pipeline stages.")
+STAGE_IN_FLIGHT = registry.gauge("research_stage_in_flight", "Stage executions currently running.")
+STAGE_ERRORS = registry.counter("research_stage_errors_total", "Stage executions that raised.")
+TOKENS = registry.counter("bedrock_tokens_total", "Estimated Bedrock tokens by direction.")
+BYTES = registry.counter("research_bytes_total", "Bytes produced or transferred, by kind.")
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans = []
+
+    def timing(self):
+        """Per-stage totals in milliseconds, in first-seen order."""
+        totals = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return {name: round(s * 1000, 1) for name, s in totals.items()}
+
+    def header(self):
+        """``Server-Timing`` style value: ``name;dur=ms, ...``."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.timing().items())
+
+    def run(self, fn, *args, **kwargs):
+        """Call ``fn`` with this trace current, e.g. from inside a streaming generator."""
+        token = _current.set(self)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace(trace_id=None):
+    trace = Trace(trace_id)
+    return trace, _current.set(trace)
+
+
+def end_trace(token):
+    _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+def record(name, seconds, error=False, trace=None):
+    """Record a stage timing measured by hand (e.g. across the yields of a stream)."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if error:
+        STAGE_ERRORS.inc(stage=name)
+    trace = trace or _current.get()
+    if trace is not None:
+        trace.spans.append((name, seconds))
+
+
+class span:
+    """Time a block: ``with span("arxiv.fetch"): ...``. Also usable as a decorator."""
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT.inc(stage=self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_IN_FLIGHT.dec(stage=self.name)
+        record(self.name, time.perf_counter() - self.t0, error=exc_type is not None)
+        return False
+
+    def __call__(self, fn):
+        name = self.name
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
@@ -0,0 +1,361 @@
+# services/typeset.py
+import functools
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from services.sections import split_sections
+
+log = logging.getLogger(__name__)
+
+# Worker processes for layout; 0 renders in the calling thread.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+
+BODY = ("Times-Roman", 10, 12)  # font, size, leading
+ABSTRACT = ("Times-Bold", 9, 11)
+REFERENCE = ("Times-Roman", 8, 9.5)
+HEADING = ("Times-Roman", 10, 12)
+TITLE = ("Times-Roman", 22, 26)
+SUBTITLE = ("Times-Italic", 10, 14)
+RUNNING = ("Times-Roman", 8)
+PARA_INDENT = 10
+MAX_STRETCH = 4.0  # points of extra space per gap before a line is left ragged instead of justified
+
+UNNUMBERED = {"abstract", "keywords", "references"}
+LEAD_INS = {"abstract": "Abstract—", "keywords": "Index Terms—"}
+_ITEM = re.compile(r"^\s*(?:[-*•]|\[\d+\]|\d+[.)])\s+")
+_TITLE = re.compile(r"^title\s*:\s*(.+)$", re.I)
+_ROMAN = ((10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"))
+
+
+@functools.lru_cache(maxsize=65536)
+def _units(word, font):
+    """Width of ``word`` in ``font`` at 1000 pt; layout measures each distinct word once per process."""
+    return stringWidth(word, font, 1000)
+
+
+def text_width(text, font, size):
+    return _units(text, font) * size / 1000.0
+
+
+def _roman(n):
+    out = ""
+    for value, numeral in _ROMAN:
+        while n >= value:
+            out, n = out + numeral, n - value
+    return out
+
+
+class PageTemplate:
+    """Page geometry for two-column output, computed once per page size.
+
+    The first page opens with a full-width title block; later pages
+    carry a running header drawn from a PDF form defined once per document.
+    """
+
+    def __init__(self, pagesize=A4, margin=54, gutter=18, bottom=64, title_gap=18):
+        self.width, self.height = pagesize
+        self.margin, self.bottom = margin, bottom
+        self.text_width = self.width - 2 * margin
+        self.column_width = (self.text_width - gutter) / 2
+        self.columns = (margin, margin + self.column_width + gutter)
+        self.top = self.height - margin
+        self.title_gap = title_gap
+
+    def start_page(self, c, page, title):
+        if page > 1:
+            if not c.hasForm("chrome"):
+                c.beginForm("chrome")
+                c.setFont(*RUNNING)
+                c.drawString(self.margin, self.height - 36, _clip(title, RUNNING, self.text_width * 0.8))
+                c.setLineWidth(0.4)
+                c.line(self.margin, self.height - 40, self.width - self.margin, self.height - 40)
+                c.endForm()
+            c.doForm("chrome")
+        c.setFont(*RUNNING)
+        c.drawCentredString(self.width / 2, self.bottom - 28, str(page))
+
+
+@functools.lru_cache(maxsize=None)
+def page_template(pagesize=A4):
+    return PageTemplate(pagesize)
+
+
+def _clip(text, style, width):
+    font, size = style[:2]
+    if text_width(text, font, size) <= width:
+        return text
+    while text and text_width(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+class Line:
+    __slots__ = ("runs", "width", "avail", "size", "leading", "indent", "align", "space_before", "keep")
+
+    def __init__(self, runs, width, avail, size, leading, indent=0, align="left", space_before=0, keep=0):
+        self.runs, self.width, self.avail, self.size, self.leading = runs, width, avail, size, leading
+        self.indent, self.align, self.space_before, self.keep = indent, align, space_before, keep
+
+
+def _split_long(word, font, size, avail):
+    """Hard-break a word (usually a URL) that is wider than the column."""
+    parts, current = [], ""
+    for ch in word:
+        if current and text_width(current + ch, font, size) > avail:
+            parts.append(current)
+            current = ""
+        current += ch
+    return parts + [current] if current else parts
+
+
+def break_lines(words, avail, style, first_indent=0, indent=0, align="justify", space_before=0):
+    """Greedy line breaking of ``[(word, font)]`` at ``style`` size into justified :class:`Line` objects."""
+    _, size, leading = style
+    lines, runs, used = [], [], 0.0
+    line_indent = first_indent
+
+    def emit(last):
+        lines.append(Line(runs, used, avail - line_indent, size, leading, line_indent,
+                          "left" if last and align == "justify" else align,
+                          space_before if not lines else 0))
+
+    for word, font in words:
+        width = text_width(word, font, size)
+        space = text_width(" ", runs[-1][1], size) if runs else 0
+        if runs and used + space + width > avail - line_indent:
+            emit(False)
+            runs, used, line_indent = [], 0.0, indent
+            space = 0
+        if width > avail - line_indent:
+            pieces = _split_long(word, font, size, avail - line_indent)
+            for piece in pieces[:-1]:
+                runs, used = [(piece, font)], text_width(piece, font, size)
+                emit(False)
+                runs, used, line_indent = [], 0.0, indent
+            word, width = pieces[-1], text_width(pieces[-1], font, size)
+        runs.append((word, font))
+        used += space + width
+    if runs:
+        emit(True)
+    return lines
+
+
+def _paragraphs(body):
+    """Body text as paragraphs; blank lines and list items (``-``, ``1.``, ``[1]``) start new ones."""
+    paras, current, is_item = [], [], False
+    for raw in body.splitlines():
+        line = raw.strip()
+        if not line or _ITEM.match(line):
+            if current:
+                paras.append((" ".join(current), is_item))
+            current = [line] if line else []
+            is_item = bool(line)
+            continue
+        if not current:
+            is_item = False
+        current.append(line)
+    if current:
+        paras.append((" ".join(current), is_item))
+    return paras
+
+
+def _words(text, font):
+    return [(w, font) for w in text.split()]
+
+
+def paper_sections(text, title=None):
+    """``(title, sections)`` for generated paper text.
+
+    A leading "Title: ..." line names the paper; otherwise ``title`` is used,
+    and failing that the first line of the preamble.
+    """
+    sections = split_sections(text)
+    if sections and sections[0][0] == "preamble":
+        first, _, rest = sections[0][1].partition("\n")
+        first = first.strip().strip("#*_ ")
+        named = _TITLE.match(first)
+        if named or not title:
+            title = named.group(1).strip() if named else first
+            sections = ([("preamble", rest.strip())] if rest.strip() else []) + sections[1:]
+    return title, sections
+
+
+def layout(sections, title, subtitle=None, template=None):
+    """Title lines and column lines for ``[(section, body), ...]`` (see services.sections.split_sections)."""
+    template = template or page_template()
+    avail = template.column_width
+    title_lines = break_lines(_words(title or "Untitled", TITLE[0]), template.text_width, TITLE, align="center")
+    if subtitle:
+        title_lines += break_lines(_words(subtitle, SUBTITLE[0]), template.text_width, SUBTITLE,
+                                   align="center", space_before=4)
+    lines, number = [], 0
+    for name, body in sections:
+        if name == "preamble":
+            style, heading = BODY, None
+        elif name in UNNUMBERED:
+            style = REFERENCE if name == "references" else (ABSTRACT if name in LEAD_INS else BODY)
+            heading = "REFERENCES" if name == "references" else None
+        else:
+            number += 1
+            style, heading = BODY, f"{_roman(number)}. {name.upper()}"
+        if heading:
+            head = break_lines(_words(heading, HEADING[0]), avail, HEADING, align="center", space_before=10)
+            for line in head:
+                line.keep = 2  # never strand a heading at the bottom of a column
+            lines += head
+        for i, (text, is_item) in enumerate(_paragraphs(body)):
+            words = _words(text, style[0])
+            if i == 0 and name in LEAD_INS:
+                words = [(LEAD_INS[name], "Times-BoldItalic")] + words
+            if is_item:
+                marker = text.split()[0] + " "
+                hang = text_width(marker, style[0], style[1])
+                lines += break_lines(words, avail, style, indent=hang, space_before=2)
+            else:
+                first = 0 if name in LEAD_INS else PARA_INDENT
+                lines += break_lines(words, avail, style, first_indent=first)
+    return title_lines, lines
+
+
+def _draw_line(c, line, x, y):
+    size = line.size
+    extra = 0.0
+    gaps = len(line.runs) - 1
+    if line.align == "justify" and gaps:
+        extra = (line.avail - line.width) / gaps
+        if extra > MAX_STRETCH:
+            extra = 0.0
+    if line.align == "center":
+        x += (line.avail - line.width) / 2
+    else:
+        x += line.indent
+    t = c.beginText(x, y)
+    t.setWordSpace(extra)
+    # One text-show operator per font change, not per word; the word spacing stretches the gaps.
+    start = 0
+    for i in range(1, len(line.runs) + 1):
+        if i == len(line.runs) or line.runs[i][1] != line.runs[start][1]:
+            t.setFont(line.runs[start][1], size)
+            words = " ".join(w for w, _ in line.runs[start:i])
+            t.textOut(words if i == len(line.runs) else words + " ")
+            start = i
+    c.drawText(t)
+
+
+def typeset(sections, title, subtitle=None):
+    """Lay out and render a two-column paper; returns the PDF bytes."""
+    template = page_template()
+    title_lines, lines = layout(sections, title, subtitle, template)
+    out = io.BytesIO()
+    c = canvas.Canvas(out, pagesize=(template.width, template.height), pageCompression=1)
+    c.setTitle(title or "")
+    page = 1
+    template.start_page(c, page, title or "")
+
+    y = template.top
+    for line in title_lines:
+        y -= line.space_before + line.leading
+        _draw_line(c, line, template.margin, y)
+    top = y - template.title_gap
+    column, y = 0, top
+
+    for i, line in enumerate(lines):
+        need = line.space_before + line.leading
+        if line.keep:
+            need += sum(l.leading for l in lines[i + 1:i + 1 + line.keep])
+        if y - need < template.bottom and y < top:
+            column += 1
+            if column == len(template.columns):
+                c.showPage()
+                page += 1
+                template.start_page(c, page, title or "")
+                column, top = 0, template.top
+            y = top
+        if y < top:
+            y -= line.space_before
+        y -= line.leading
+        _draw_line(c, line, template.columns[column], y)
+    c.showPage()
+    c.save()
+    return out.getvalue()
+
+
+def _warm():
+    # Pool initializer: load the Type 1 metrics before the first job arrives.
+    for font in {BODY[0], ABSTRACT[0], HEADING[0], TITLE[0], SUBTITLE[0], "Times-BoldItalic"}:
+        _units(" ", font)
+
+
+class RenderPool:
+    """Process pool for PDF layout, started on first use.
+
+    Layout is pure Python and holds the GIL, so rendering in request threads
+    stalls every other thread (and the event loop) in the process. Workers
+    are started with ``forkserver`` where available so they never inherit the
+    parent's threads or locks; a forked child gets a pool of its own.
+    """
+
+    def __init__(self, workers=PDF_RENDER_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = os.getpid()
+        self.fallbacks = 0
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = os.getpid()
+
+    def _executor(self):
+        if self._pid != os.getpid():
+            self.reset()
+        with self._lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                if "forkserver" in methods:
+                    ctx.set_forkserver_preload(["services.typeset"])
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_warm)
+            return self._pool
+
+    def render(self, sections, title, subtitle=None):
+        if self.workers <= 0:
+            return typeset(sections, title, subtitle)
+        try:
+            return self._executor().submit(typeset, list(sections), title, subtitle).result()
+        except BrokenProcessPool:
+            log.exception("PDF render pool died; rendering in-process")
+            with self._lock:
+                self._pool = None
+                self.fallbacks += 1
+            return typeset(sections, title, subtitle)
+
+    def snapshot(self):
+        return {"workers": self.workers, "started": self._pool is not None, "fallbacks": self.fallbacks}
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+pool = RenderPool()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pool.reset)
+
+
+def render(sections, title, subtitle=None):
+    """PDF bytes for ``sections``, rendered in the worker pool (see PDF_RENDER_WORKERS)."""
+    return pool.render(sections, title, subtitle)
@@ -0,0 +1,332 @@
+# services/vector_index.py
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, one writer process only
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(".cache", "vector_index"))
+QUANTIZE = os.getenv("VECTOR_INDEX_QUANTIZE", "0") == "1"
+IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", 20000))
+IVF_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", 8))
+
+
+def paper_key(paper):
+    """Stable identity for a paper across sources: URL if present, else normalized title."""
+    key = paper.get("id") or paper.get("url")
+    if key:
+        return str(key).strip()
+    return "title:" + re.sub(r"[^a-z0-9]+", " ", (paper.get("title") or "").lower()).strip()
+
+
+def _kmeans(data, k, iters=15, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            if len(members):
+                v = members.mean(axis=0)
+                n = np.linalg.norm(v)
+                centroids[c] = v / n if n else v
+    return centroids
+
+
+class VectorIndex:
+    """Append-only on-disk paper index with cosine top-k search.
+
+    Unit-normalized vectors are appended to a raw float32 (or int8 with a
+    per-row scale) file that is read back through ``np.memmap``; paper
+    metadata lives in SQLite. Once the index holds ``ivf_min_rows`` vectors a
+    k-means coarse quantizer is trained on a background thread (or by an
+    explicit :meth:`train`) and searches only scan the ``nprobe`` closest
+    inverted lists. Rows appended while training runs go to list -1, which
+    every search scans.
+    """
+
+    def __init__(self, path=INDEX_DIR, quantize=QUANTIZE, ivf_min_rows=IVF_MIN_ROWS, nprobe=IVF_NPROBE):
+        self.path = path
+        self.quantize = quantize
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._vec_path = os.path.join(path, "vectors.i8" if quantize else "vectors.f32")
+        self._centroid_path = os.path.join(path, "centroids.npy")
+        self._lock_path = os.path.join(path, "index.lock")
+        self._db = sqlite3.connect(os.path.join(path, "meta.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            "row INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, title TEXT, abstract TEXT, "
+            "url TEXT, source TEXT, year INTEGER, scale REAL NOT NULL DEFAULT 1.0, list_id INTEGER NOT NULL DEFAULT -1)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        row = self._db.execute("SELECT value FROM settings WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM papers").fetchone()[0]
+        self._mmap = None
+        self._mmap_rows = 0
+        self._scales = np.zeros(0, dtype=np.float32)  # per-row int8 scale, only kept when quantizing
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._training = None
+        self._centroids = np.load(self._centroid_path) if os.path.exists(self._centroid_path) else None
+        self._trained_rows = int(self._setting("trained_rows") or 0)
+
+    def __len__(self):
+        return self._count
+
+    def _setting(self, name):
+        row = self._db.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, name, value):
+        self._db.execute("INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)", (name, str(value)))
+
+    @contextmanager
+    def _exclusive(self):
+        """Thread lock plus an flock on the index directory: uvicorn workers share one index."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._lock_path, "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _row_bytes(self):
+        return self.dim * (1 if self.quantize else 4)
+
+    def _refresh(self):
+        """Pick up rows (and a retrained quantizer) written by other processes."""
+        count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM papers").fetchone()[0]
+        trained = int(self._setting("trained_rows") or 0)
+        if self.dim is None:
+            row = self._db.execute("SELECT value FROM settings WHERE name = 'dim'").fetchone()
+            self.dim = int(row[0]) if row else None
+        if trained != self._trained_rows:
+            # Another process retrained: every list id may have moved.
+            self._trained_rows = trained
+            self._centroids = np.load(self._centroid_path) if os.path.exists(self._centroid_path) else None
+            self._scales = np.zeros(0, dtype=np.float32)
+            self._lists = np.zeros(0, dtype=np.int32)
+        self._count = count
+
+    def contains(self, paper):
+        row = self._db.execute("SELECT 1 FROM papers WHERE key = ?", (paper_key(paper),)).fetchone()
+        return row is not None
+
+    def add(self, papers, vectors):
+        """Append papers not already indexed. Returns the number of new rows."""
+        vecs = np.asarray(vectors, dtype=np.float32)
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        with self._exclusive():
+            self._refresh()
+            new_dim = self.dim is None
+            if new_dim:
+                self.dim = vecs.shape[1]
+                self._set("dim", self.dim)
+            elif vecs.shape[1] != self.dim:
+                raise ValueError(f"vector dim {vecs.shape[1]} does not match index dim {self.dim}")
+            fresh, seen = [], set()
+            for p, v in zip(papers, vecs):
+                key = paper_key(p)
+                if key in seen or self.contains(p):
+                    continue
+                seen.add(key)
+                fresh.append((key, p, v))
+            if not fresh:
+                self._db.commit()
+                return 0
+            mat = np.stack([v for _, _, v in fresh])
+            norms = np.linalg.norm(mat, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            mat = mat / norms
+            lists = self._assign(mat) if self._centroids is not None else np.full(len(mat), -1)
+            if self.quantize:
+                scales = np.abs(mat).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                blob = np.round(mat / scales[:, None]).astype(np.int8)
+            else:
+                scales = np.ones(len(mat), dtype=np.float32)
+                blob = mat.astype(np.float32)
+            # Row numbers come from the metadata; the vector file is cut back to match it,
+            # which also drops vectors left behind by a writer that failed part-way.
+            end = self._count * self._row_bytes()
+            with open(self._vec_path, "ab") as fh:
+                fh.truncate(end)
+                fh.write(blob.tobytes())
+            try:
+                self._db.executemany(
+                    "INSERT INTO papers (row, key, title, abstract, url, source, year, scale, list_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (self._count + i, key, p.get("title"), p.get("abstract") or p.get("summary"),
+                         p.get("url"), p.get("source"), p.get("year"), float(scales[i]), int(lists[i]))
+                        for i, (key, p, _) in enumerate(fresh)
+                    ],
+                )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                if new_dim:
+                    self.dim = None
+                with open(self._vec_path, "ab") as fh:
+                    fh.truncate(end)
+                raise
+            if len(self._lists) == self._count:
+                self._lists = np.concatenate([self._lists, lists.astype(np.int32)])
+                if self.quantize:
+                    self._scales = np.concatenate([self._scales, scales.astype(np.float32)])
+            self._count += len(fresh)
+            if self._count >= self.ivf_min_rows and self._count >= 2 * max(self._trained_rows, 1):
+                self._train_in_background()
+            return len(fresh)
+
+    def _matrix(self):
+        if self._mmap is None or self._mmap_rows != self._count:
+            dtype = np.int8 if self.quantize else np.float32
+            self._mmap = np.memmap(self._vec_path, dtype=dtype, mode="r", shape=(self._count, self.dim))
+            self._mmap_rows = self._count
+        if len(self._lists) < self._count:
+            # Only rows this process has not seen yet; earlier ones never change outside a retrain.
+            start = len(self._lists)
+            cols = "list_id, scale" if self.quantize else "list_id"
+            rows = self._db.execute(f"SELECT {cols} FROM papers WHERE row >= ? AND row < ? ORDER BY row",
+                                    (start, self._count)).fetchall()
+            self._lists = np.concatenate([self._lists, np.array([r[0] for r in rows], dtype=np.int32)])
+            if self.quantize:
+                self._scales = np.concatenate([self._scales, np.array([r[1] for r in rows], dtype=np.float32)])
+        return self._mmap
+
+    def _rows(self, idx):
+        mat = self._matrix()
+        block = np.asarray(mat[idx], dtype=np.float32)
+        if self.quantize:
+            block *= self._scales[idx][:, None]
+        return block
+
+    def _assign(self, mat):
+        return np.argmax(mat @ self._centroids.T, axis=1)
+
+    def train(self, nlist=None, sample=50000):
+        """(Re)build the IVF coarse quantizer over the current contents.
+
+        Sampling, k-means and list assignment run without the index lock on a
+        snapshot of the rows present at the start, so writers keep appending
+        (to list -1) and searches keep answering; only rows added meanwhile
+        are assigned under the lock.
+        """
+        with self._exclusive():
+            self._refresh()
+            count = self._count
+            if count == 0:
+                return
+            self._matrix()
+            dtype = np.int8 if self.quantize else np.float32
+            snapshot = np.memmap(self._vec_path, dtype=dtype, mode="r", shape=(count, self.dim))
+            scales = self._scales[:count].copy()
+
+        def rows(idx):
+            block = np.asarray(snapshot[idx], dtype=np.float32)
+            if self.quantize:
+                block *= scales[idx][:, None]
+            return block
+
+        rng = np.random.default_rng(0)
+        pick = np.sort(rng.choice(count, size=min(sample, count), replace=False))
+        centroids = _kmeans(rows(pick), min(nlist or max(1, int(np.sqrt(count))), len(pick)))
+        lists = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 8192):
+            idx = np.arange(start, min(start + 8192, count))
+            lists[idx] = np.argmax(rows(idx) @ centroids.T, axis=1)
+
+        with self._exclusive():
+            self._refresh()
+            if self._trained_rows >= count:
+                return  # another process finished a quantizer over at least as many rows
+            if self._count > count:
+                tail = np.arange(count, self._count)
+                lists = np.concatenate([lists, np.argmax(self._rows(tail) @ centroids.T, axis=1).astype(np.int32)])
+            tmp = f"{self._centroid_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                np.save(fh, centroids)
+            os.replace(tmp, self._centroid_path)  # readers in other processes never see a partial file
+            self._db.executemany("UPDATE papers SET list_id = ? WHERE row = ?",
+                                 [(int(l), i) for i, l in enumerate(lists)])
+            self._set("trained_rows", self._count)
+            self._db.commit()
+            self._centroids = centroids
+            self._trained_rows = self._count
+            self._lists = lists
+
+    def _train_in_background(self):
+        if self._training is not None and self._training.is_alive():
+            return
+
+        def run():
+            try:
+                self.train()
+            except Exception:
+                log.exception("vector index training failed")
+
+        self._training = threading.Thread(target=run, name="vector-index-train", daemon=True)
+        self._training.start()
+
+    def search(self, query_vec, k=10, nprobe=None):
+        """Return up to k ``(score, paper)`` pairs by cosine similarity, best first."""
+        with self._lock:
+            self._refresh()
+            if self._count == 0:
+                return []
+            q = np.asarray(query_vec, dtype=np.float32)
+            q = q / (np.linalg.norm(q) or 1.0)
+            self._matrix()
+            if self._centroids is not None:
+                nprobe = min(nprobe or self.nprobe, len(self._centroids))
+                probe = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+                candidates = np.flatnonzero(np.isin(self._lists, probe) | (self._lists < 0))
+            else:
+                candidates = np.arange(self._count)
+            if not len(candidates):
+                return []
+            scores = self._rows(candidates) @ q
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = [int(candidates[i]) for i in top]
+            marks = ",".join("?" * len(rows))
+            meta = {
+                r[0]: {"id": r[1], "title": r[2], "abstract": r[3], "url": r[4], "source": r[5], "year": r[6]}
+                for r in self._db.execute(
+                    f"SELECT row, key, title, abstract, url, source, year FROM papers WHERE row IN ({marks})", rows)
+            }
+            return [(float(scores[i]), meta[r]) for i, r in zip(top, rows)]
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_index():
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = VectorIndex()
+    return _default_index
@@ -4,6 +4,9 @@ import requests
 import json
 from datetime import datetime
 import base64
+import time
+import uuid
+from services import http_client
 
 # ==============================
 # 🎨 Streamlit Config
@@ -19,8 +22,11 @@ st.set_page_config(
 # ==============================
 DEFAULT_BACKEND = "http://127.0.0.1:8000"
 RESEARCH_ENDPOINT = "/research/"
+RESEARCH_STREAM_ENDPOINT = "/research/stream"
 CHATBOT_ENDPOINT = "/chatbot/"
 HISTORY_ENDPOINT = "/history/"
+POLL_INTERVAL = 1.5
+POLL_TIMEOUT = 600
 
 # ==============================
 # 🔍 Helper Functions
@@ -29,23 +35,74 @@ def post_research(topic: str, backend: str):
     url = backend.rstrip("/") + RESEARCH_ENDPOINT
     payload = {"prompt": topic}
     headers = {"Content-Type": "application/json"}
-    resp = requests.post(url, json=payload, headers=headers, timeout=120)
+    # No retries: a 429 from our own queue should reach the user at once, not after Retry-After waits.
+    resp = http_client.post(url, json=payload, headers=headers, timeout=15, retries=0)
     resp.raise_for_status()
     return resp.json()
 
-def post_chat(question: str, context: str, backend: str):
+def get_research_job(job_id: str, backend: str):
+    url = backend.rstrip("/") + RESEARCH_ENDPOINT + job_id
+    resp = http_client.get(url, timeout=15)
+    resp.raise_for_status()
+    return resp.json()
+
+def wait_for_research(job_id: str, backend: str, on_progress=None):
+    deadline = time.time() + POLL_TIMEOUT
+    while time.time() < deadline:
+        job = get_research_job(job_id, backend)
+        if on_progress:
+            on_progress(job)
+        if job["status"] == "done":
+            return job["result"]
+        if job["status"] == "failed":
+            raise RuntimeError(job.get("error") or "Research job failed.")
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError("Timed out waiting for research job.")
+
+def stream_research(topic: str, backend: str):
+    """Yield (event, data) pairs from the /research/stream SSE endpoint."""
+    url = backend.rstrip("/") + RESEARCH_STREAM_ENDPOINT
+    with http_client.post(url, json={"prompt": topic}, stream=True, timeout=(10, 300), retries=0) as resp:
+        resp.raise_for_status()
+        event, data = "message", []
+        for line in resp.iter_lines(decode_unicode=True):
+            if line == "":
+                if data:
+                    yield event, json.loads("\n".join(data))
+                event, data = "message", []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+
+def post_chat(question: str, paper_id: str, session_id: str, backend: str):
     url = backend.rstrip("/") + CHATBOT_ENDPOINT
-    payload = {"question": question, "context": context}
+    payload = {"question": question, "paper_id": paper_id, "session_id": session_id}
     headers = {"Content-Type": "application/json"}
-    resp = requests.post(url, json=payload, headers=headers, timeout=60)
+    resp = http_client.post(url, json=payload, headers=headers, timeout=60, retries=0)
     resp.raise_for_status()
     return resp.json()
 
-def get_history(backend: str):
+def get_history(backend: str, cursor: str = None, query: str = None, limit: int = 20):
+    """Fetch one history page, revalidating with the ETag from the last identical request."""
     url = backend.rstrip("/") + HISTORY_ENDPOINT
-    resp = requests.get(url, timeout=30)
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if query:
+        params["q"] = query
+    cache = st.session_state.setdefault("history_cache", {})
+    cache_key = json.dumps([backend, params], sort_keys=True)
+    cached = cache.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    resp = http_client.get(url, params=params, headers=headers, timeout=30)
+    if resp.status_code == 304 and cached:
+        return cached[1]
     resp.raise_for_status()
-    return resp.json()
+    data = resp.json()
+    if resp.headers.get("ETag"):
+        cache[cache_key] = (resp.headers["ETag"], data)
+    return data
 
 def download_link(text: str, filename: str, label: str = "📥 Download"):
     b64 = base64.b64encode(text.encode()).decode()
@@ -61,6 +118,7 @@ def pretty_datetime():
 with st.sidebar:
     st.title("⚙️ Settings")
     backend_url = st.text_input("Backend URL", value=DEFAULT_BACKEND)
+    stream_output = st.toggle("Stream generation", value=True)
     st.caption("Ensure your FastAPI backend is running.")
     st.divider()
 
@@ -93,10 +151,42 @@ with tabs[0]:
             st.warning("⚠️ Please enter a topic.")
             st.stop()
 
-        st.info("⏳ Fetching research papers and generating IEEE-style paper...")
+        status_box = st.info("⏳ Fetching research papers and generating IEEE-style paper...")
         try:
-            response = post_research(topic, backend_url)
-        except requests.exceptions.RequestException as e:
+            if stream_output:
+                live_text = st.empty()
+                response, parts, section = None, [], None
+                for event, data in stream_research(topic, backend_url):
+                    if event == "papers":
+                        status_box.info(f"✍️ Found {len(data)} papers, writing draft...")
+                    elif event == "section":
+                        section = data["name"]
+                        status_box.info(f"✍️ Writing {section.title()}...")
+                    elif event == "token":
+                        parts.append(data["text"])
+                        live_text.markdown("".join(parts))
+                    elif event == "stage":
+                        status_box.info("📄 Rendering PDF and uploading to S3...")
+                    elif event == "done":
+                        response = data
+                    elif event == "error":
+                        raise RuntimeError(data.get("detail", "Generation failed."))
+                live_text.empty()
+                if response is None:
+                    raise RuntimeError("Stream ended before the paper was published.")
+            else:
+                job = post_research(topic, backend_url)
+                response = wait_for_research(
+                    job["job_id"], backend_url,
+                    on_progress=lambda j: status_box.info(f"⏳ {j['status'].title()}: {j.get('stage') or 'waiting for a worker'}...")
+                )
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                st.error("❌ The server is busy. Please try again in a few seconds.")
+            else:
+                st.error(f"❌ Request failed: {e}")
+            st.stop()
+        except (requests.exceptions.RequestException, RuntimeError, TimeoutError) as e:
             st.error(f"❌ Request failed: {e}")
             st.stop()
 
@@ -124,7 +214,7 @@ with tabs[0]:
                         st.markdown(f"**Source:** {paper.get('source', 'N/A')}")
                         if paper.get("url"):
                             st.markdown(f"[🔗 Read Paper]({paper['url']})")
-                        st.markdown(f"**Summary:** {paper.get('summary', '')}")
+                        st.markdown(f"**Summary:** {paper.get('abstract') or paper.get('summary', '')}")
 
         with col2:
             st.markdown("### 🤖 IEEE Paper Summary")
@@ -152,12 +242,13 @@ with tabs[1]:
     if "last_summary" not in st.session_state:
         st.info("⚠️ No summary generated yet. Please generate one first.")
     else:
-        context = json.dumps(st.session_state["last_summary"])
+        paper_id = st.session_state["last_summary"].get("paper_id")
+        session_id = st.session_state.setdefault("chat_session_id", uuid.uuid4().hex)
         question = st.text_input("Ask a question (e.g., 'Summarize related works of paper #2')")
         if st.button("Ask"):
             with st.spinner("Thinking..."):
                 try:
-                    res = post_chat(question, context, backend_url)
+                    res = post_chat(question, paper_id, session_id, backend_url)
                     answer = res.get("answer", "No answer found.")
                     st.markdown(f"**🧠 Answer:** {answer}")
                 except Exception as e:
@@ -168,16 +259,27 @@ with tabs[1]:
 # =============================
 with tabs[2]:
     st.subheader("📂 Previously Generated Papers (from S3)")
+    history_query = st.text_input("Filter by topic", key="history_query")
+    pages = st.session_state.setdefault("history_pages", 1)
     try:
-        history = get_history(backend_url)
-        files = history.get("files", [])
+        files, cursor = [], None
+        for _ in range(pages):
+            history = get_history(backend_url, cursor=cursor, query=history_query.strip() or None)
+            files += history.get("files", [])
+            cursor = history.get("next_cursor")
+            if not cursor:
+                break
         if not files:
             st.info("No research papers found in S3 yet.")
         else:
             for f in files:
-                with st.expander(f"📘 {f['file_name']}"):
+                with st.expander(f"📘 {f.get('topic') or f['file_name']}"):
+                    st.markdown(f"**File:** {f['file_name']}")
                     st.markdown(f"**Uploaded:** {f['last_modified']}")
                     st.markdown(f"[🔗 View PDF]({f['url']})")
+            if cursor and st.button("Load more"):
+                st.session_state["history_pages"] = pages + 1
+                st.rerun()
     except Exception as e:
         st.error(f"❌ Failed to fetch S3 history: {e}")
 
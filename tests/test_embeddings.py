@@ -0,0 +1,22 @@
+# tests/test_embeddings.py
+import pytest
+
+from services import embeddings
+from services.embeddings import rank_papers_by_relevance
+
+
+@pytest.fixture
+def no_bedrock(monkeypatch):
+    def invoke(text):
+        raise AssertionError(f"unexpected embedding call for {text!r}")
+    monkeypatch.setattr(embeddings, "_invoke_embedding", invoke)
+
+
+def test_papers_without_abstracts_keep_bm25_order(no_bedrock):
+    papers = [
+        {"title": "Graph nets", "url": "u2", "summary": ""},
+        {"title": "Deep learning for X", "url": "u1"},
+    ]
+    ranked = rank_papers_by_relevance("deep learning", papers)
+    assert [p["url"] for p in ranked] == ["u1", "u2"]
+    assert [p["url"] for p in rank_papers_by_relevance("deep learning", papers, top_k=1)] == ["u1"]
@@ -0,0 +1,156 @@
+# tests/test_fetch_papers.py
+import io
+import os
+import re
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from services import fetch_papers
+from services.fetch_papers import fetch_arxiv, iter_arxiv, parse_arxiv_feed
+
+FIXTURE = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures", "arxiv_feed.xml")
+
+
+def load_fixture():
+    with open(FIXTURE, "rb") as fh:
+        return fh.read()
+
+
+def feed_with(entries, start=0):
+    """The saved feed rewritten to hold ``entries`` entries with distinct ids."""
+    feed = load_fixture()
+    head, rest = feed.split(b"<entry>", 1)
+    body, tail = rest.rsplit(b"</entry>", 1)
+    template = body.split(b"</entry>", 1)[0] + b"</entry>"
+    out = [head]
+    for i in range(start, start + entries):
+        out.append(b"<entry>" + template.replace(b"</id>", f"-{i}</id>".encode(), 1))
+    out.append(tail)
+    return b"".join(out)
+
+
+@pytest.fixture(scope="module")
+def papers():
+    return list(parse_arxiv_feed(io.BytesIO(load_fixture())))
+
+
+def test_parses_every_entry(papers):
+    assert [p["url"] for p in papers] == [
+        "http://arxiv.org/abs/2005.11401v4",
+        "http://arxiv.org/abs/2007.01282v2",
+        "http://arxiv.org/abs/cs/0112017v1",
+    ]
+    assert all(p["source"] == "arXiv" for p in papers)
+
+
+def test_whitespace_is_collapsed(papers):
+    assert papers[0]["title"] == "Retrieval-Augmented Generation for Knowledge-Intensive NLP Tasks"
+    assert papers[0]["summary"].startswith("Large pre-trained language models have been shown to store factual knowledge in")
+    assert "\n" not in papers[0]["summary"]
+
+
+def test_cdata_and_attributes(papers):
+    # <title type="text"><![CDATA[...]]> and markup inside CDATA stay plain text.
+    assert papers[1]["title"] == "Leveraging Passage Retrieval with Generative Models for Open Domain QA"
+    assert "retrieving text passages <b>potentially</b> containing evidence." in papers[1]["summary"]
+
+
+def test_entities(papers):
+    assert papers[2]["title"] == "Information Retrieval & Ranking: A Survey"
+    assert "models & their ranking" in papers[2]["summary"]
+
+
+def test_namespaced_fields(papers):
+    assert papers[0]["authors"] == ["Patrick Lewis", "Ethan Perez"]
+    assert papers[1]["doi"] == "10.18653/v1/2021.eacl-main.74"
+    assert papers[0]["doi"] is None
+    assert papers[0]["pdf_url"] == "http://arxiv.org/pdf/2005.11401v4"
+    assert papers[2]["pdf_url"] is None
+    assert [p["year"] for p in papers] == [2020, 2020, 2001]
+
+
+def test_entries_without_title_are_skipped():
+    feed = re.sub(rb"<title>Information Retrieval.*?</title>", b"<title></title>", load_fixture(), flags=re.S)
+    assert len(list(parse_arxiv_feed(io.BytesIO(feed)))) == 2
+
+
+def test_large_feed_streams():
+    feed = feed_with(500)
+    urls = [p["url"] for p in parse_arxiv_feed(io.BytesIO(feed))]
+    assert len(urls) == 500
+    assert urls[-1] == "http://arxiv.org/abs/2005.11401v4-499"
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeArxiv:
+    """Serves ``total`` results, paged by the ``start``/``max_results`` query parameters."""
+
+    def __init__(self, total):
+        self.total = total
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        params = parse_qs(urlparse(url).query)
+        start, size = int(params["start"][0]), int(params["max_results"][0])
+        self.requests.append((start, size))
+        return FakeResponse(feed_with(max(0, min(size, self.total - start)), start))
+
+
+@pytest.fixture
+def arxiv(monkeypatch):
+    def install(total):
+        fake = FakeArxiv(total)
+        monkeypatch.setattr(fetch_papers, "http_client", fake)
+        monkeypatch.setattr(fetch_papers, "_polite", lambda url, timeout: None)
+        return fake
+    return install
+
+
+def test_pages_lazily(arxiv):
+    fake = arxiv(total=1000)
+    papers = iter_arxiv("retrieval", page_size=10)
+    first = [next(papers) for _ in range(10)]
+    assert fake.requests == [(0, 10)]
+    next(papers)
+    assert fake.requests == [(0, 10), (10, 10)]
+    assert first[-1]["url"].endswith("-9")
+
+
+def test_stops_at_max_results(arxiv):
+    fake = arxiv(total=1000)
+    papers = list(iter_arxiv("retrieval", page_size=10, max_results=25))
+    assert len(papers) == 25
+    assert fake.requests == [(0, 10), (10, 10), (20, 5)]
+
+
+def test_stops_on_short_page(arxiv):
+    fake = arxiv(total=23)
+    papers = list(iter_arxiv("retrieval", page_size=10))
+    assert len(papers) == 23
+    assert fake.requests == [(0, 10), (10, 10), (20, 10)]
+
+
+def test_stops_on_empty_page(arxiv):
+    fake = arxiv(total=20)
+    assert len(list(iter_arxiv("retrieval", page_size=10))) == 20
+    assert fake.requests == [(0, 10), (10, 10), (20, 10)]
+
+
+def test_fetch_arxiv_single_request(arxiv):
+    fake = arxiv(total=1000)
+    assert len(fetch_arxiv("retrieval", max_results=3)) == 3
+    assert fake.requests == [(0, 3)]
@@ -0,0 +1,38 @@
+# tests/test_vector_index.py
+import numpy as np
+import pytest
+
+from services.vector_index import VectorIndex
+
+
+def papers(start, n):
+    return [{"url": f"u{i}", "title": f"Paper {i}"} for i in range(start, start + n)]
+
+
+@pytest.fixture(params=[False, True], ids=["float32", "int8"])
+def index(request, tmp_path):
+    return VectorIndex(path=str(tmp_path), quantize=request.param, ivf_min_rows=10 ** 9, nprobe=2)
+
+
+def test_add_extends_row_metadata_in_place(index):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((40, 16)).astype(np.float32)
+    index.add(papers(0, 20), vecs[:20])
+    index.search(vecs[0])
+    index._db.execute("UPDATE papers SET list_id = 99")  # a full reload would pick this up
+    index.add(papers(20, 20), vecs[20:])
+    assert index.search(vecs[25], k=1)[0][1]["id"] == "u25"
+    assert len(index._lists) == 40 and not (index._lists == 99).any()
+    assert len(index._scales) == (40 if index.quantize else 0)
+
+
+def test_rows_added_after_training_are_searchable(index, tmp_path):
+    rng = np.random.default_rng(1)
+    vecs = rng.standard_normal((300, 16)).astype(np.float32)
+    index.add(papers(0, 200), vecs[:200])
+    index.train(nlist=8)
+    index.add(papers(200, 100), vecs[200:])
+    assert (index._lists >= 0).all()
+    reopened = VectorIndex(path=str(tmp_path), quantize=index.quantize, nprobe=2)
+    for i in (3, 150, 250):
+        assert reopened.search(vecs[i], k=1)[0][1]["id"] == f"u{i}"